@@ -0,0 +1,214 @@
+"""
+Offline batch renderer: runs recorded webcam videos through HandDetector and the KiteApp
+frame logic headlessly and writes the rendered videos, using all cores.
+
+Each input is split into chunks that run in a process pool, in two passes:
+
+    1. detect  every chunk gets its own HandDetector and records the hand landmarks
+               of its frames to a trace file (the expensive part, fully parallel)
+    2. render  the chunk traces are joined into one. The main process replays the gesture
+               logic over it once, in order (no decoding or drawing, ~0.45 ms per frame),
+               and hands every chunk a snapshot of the app's gesture state at its first
+               frame as soon as it gets there, so placed objects, held items and filter
+               state carry across the chunk boundary exactly. Each chunk memory-maps the
+               trace into its own KiteApp with a TraceReplayDetector, restores the snapshot
+               and renders its frames
+
+The chunk videos are then joined (stream copy with ffmpeg if it is installed, re-encoded
+with OpenCV otherwise). Filter time follows the video's frame rate and no display latency
+is predicted, so the output matches a sequential render frame for frame.
+
+    python batch_render.py booth_1.mp4 booth_2.mp4 --out-dir renders --workers 8
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import cv2
+import numpy as np
+from hand_tracking import HandDetector
+from landmark_trace import TraceRecorder, TraceReplayDetector, concat_traces, read_header
+
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Could not open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, frames
+
+def open_at(path, start):
+    cap = cv2.VideoCapture(path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    return cap
+
+def video_writer(path, fps, shape):
+    fourcc = cv2.VideoWriter_fourcc(*("mp4v" if path.lower().endswith(".mp4") else "MJPG"))
+    h, w = shape[:2]
+    return cv2.VideoWriter(path, fourcc, fps, (w, h))
+
+def detect_chunk(path, start, stop, max_hands, fps, trace_path):
+    """
+    Pass 1: records the landmarks of frames [start, stop) to trace_path, stop=None reads to
+    the end of the video. Returns the number of frames.
+    """
+    cap = open_at(path, start)
+    detector = HandDetector(max_hands=max_hands, inference_scale=0.5) # As in KiteApp
+    trace = None
+    img = None
+    while stop is None or trace is None or start + trace.frames < stop:
+        ok, img = cap.read(img)
+        if not ok: break
+        if trace is None:
+            trace = TraceRecorder(trace_path, max_hands, (img.shape[1], img.shape[0]))
+        cv2.flip(img, 1, dst=img) # KiteApp mirrors before detection
+        detector.find_hands(img, draw=False)
+        detector.find_position(img, draw=False)
+        trace.record((start + trace.frames) / fps, detector)
+    cap.release()
+    if trace is None:
+        return 0
+    trace.close()
+    return trace.frames
+
+def replay_app(trace_path, start, app_options):
+    """Headless KiteApp driven by the trace from frame start on, on the recorded frame times."""
+    from kite_app import KiteApp # Imported only where apps are built
+    detector = TraceReplayDetector(trace_path, start)
+    app = KiteApp(use_camera=False, detector=detector, warm_up=False, adaptive_quality=False, **app_options)
+    app.clock = detector.clock
+    return app
+
+def render_chunk(path, start, stop, trace_path, state, out_path, app_options):
+    """
+    Pass 2: renders frames [start, stop) into out_path, continuing from state, the app's
+    gesture state at frame start (see KiteApp.gesture_state).
+    """
+    app = replay_app(trace_path, start, app_options)
+    app.restore_gesture_state(state)
+
+    cap = open_at(path, start)
+    ok, img = cap.read()
+    if not ok:
+        return 0
+
+    fps, _ = video_info(path)
+    writer = video_writer(out_path, fps, img.shape)
+    written = 0
+    while ok and start + written < stop:
+        img, results, _ = app.infer_frame(img)
+        writer.write(app.render_frame(img, results)) # No captured_at: no latency prediction offline
+        written += 1
+        ok, img = cap.read(img)
+    writer.release()
+    cap.release()
+    app.close()
+    return written
+
+def render_chunks(pool, path, chunks, stops, trace_path, parts, app_options):
+    """
+    Pass 2 for all chunks of a video. The gesture logic runs here, once and in order over the
+    whole trace; each chunk is submitted with its snapshot as soon as the replay reaches its
+    first frame, so rendering overlaps with the rest of the replay. Returns the frames written.
+    """
+    app = replay_app(trace_path, 0, app_options)
+    width, height = read_header(trace_path)[1]
+    futures = []
+    for (start, _), stop, part in zip(chunks, stops, parts):
+        app.replay_gestures(start - app.detector.frame_index, (height, width, 3))
+        futures.append(pool.submit(render_chunk, path, start, stop, trace_path, app.gesture_state(),
+                                   part, app_options))
+    app.close()
+    return sum(future.result() for future in futures)
+
+def join_videos(parts, out_path, fps):
+    """Concatenates the chunk videos into out_path."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        listing = out_path + ".parts.txt"
+        with open(listing, "w") as f:
+            f.writelines(f"file '{os.path.abspath(p)}'\n" for p in parts)
+        try:
+            subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                            "-i", listing, "-c", "copy", out_path], check=True)
+            return
+        except subprocess.CalledProcessError:
+            pass # Fall back to re-encoding
+        finally:
+            os.remove(listing)
+
+    writer = None
+    for part in parts:
+        cap = cv2.VideoCapture(part)
+        img = None
+        while True:
+            ok, img = cap.read(img)
+            if not ok: break
+            if writer is None:
+                writer = video_writer(out_path, fps, img.shape)
+            writer.write(img)
+        cap.release()
+    if writer is not None:
+        writer.release()
+
+def chunk_ranges(frames, chunk_frames):
+    """[start, stop) per chunk; the last one is open-ended (frame counts from containers can be off)."""
+    starts = list(range(0, max(frames, 1), chunk_frames))
+    return [(s, starts[i + 1] if i + 1 < len(starts) else None) for i, s in enumerate(starts)]
+
+def render_video(path, out_path, pool, chunk_seconds=10.0, max_hands=2, app_options=None):
+    fps, frames = video_info(path)
+    chunks = chunk_ranges(frames, max(1, int(chunk_seconds * fps)))
+    start_time = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix="kite_render_") as tmp:
+        traces = [os.path.join(tmp, f"chunk_{i:05d}.trace") for i in range(len(chunks))]
+        counts = list(pool.map(detect_chunk, *zip(*[(path, s, e, max_hands, fps, trace)
+                                                      for (s, e), trace in zip(chunks, traces)])))
+        if not any(counts):
+            print(f"{path}: no frames could be read")
+            return
+        trace_path = os.path.join(tmp, "video.trace")
+        concat_traces([trace for trace, n in zip(traces, counts) if n], trace_path)
+        detect_time = time.perf_counter() - start_time
+
+        ext = os.path.splitext(out_path)[1] or ".avi"
+        parts = [os.path.join(tmp, f"chunk_{i:05d}{ext}") for i in range(len(chunks))]
+        written = render_chunks(pool, path, chunks, np.cumsum(counts), trace_path, parts, app_options or {})
+        render_time = time.perf_counter() - start_time - detect_time
+
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        join_videos(parts, out_path, fps)
+
+    total = time.perf_counter() - start_time
+    print(f"{path} -> {out_path}: {written} frames in {len(chunks)} chunks, "
+          f"detect {detect_time:.1f} s + render {render_time:.1f} s, total {total:.1f} s "
+          f"({written / fps / total:.1f}x real time)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="recorded webcam videos")
+    parser.add_argument("--out-dir", default="renders")
+    parser.add_argument("--format", default="mp4", choices=["mp4", "avi"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-seconds", type=float, default=10.0)
+    parser.add_argument("--hands", type=int, default=2, help="max hands to track")
+    parser.add_argument("--cursor-filter", default="one_euro", choices=["one_euro", "kalman", "exponential"])
+    args = parser.parse_args()
+
+    # spawn: MediaPipe graphs do not survive a fork, every worker builds its own
+    with ProcessPoolExecutor(args.workers, mp_context=get_context("spawn")) as pool:
+        for path in args.inputs:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            out_path = os.path.join(args.out_dir, f"{stem}_kite.{args.format}")
+            render_video(path, out_path, pool, args.chunk_seconds, args.hands,
+                         {"cursor_filter": args.cursor_filter})
+
+if __name__ == "__main__":
+    main()
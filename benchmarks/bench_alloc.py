@@ -0,0 +1,144 @@
+"""
+Per-frame memory allocation of the frame path, measured with tracemalloc (NumPy and
+OpenCV arrays are traced through NumPy's allocator, MediaPipe's C++ internals are not).
+
+    transient  peak bytes allocated on top of the steady state while one frame is processed,
+               i.e. the temporary buffers that are allocated and freed again every frame
+               (a lower bound: buffers freed before the next one is allocated count once)
+    at 60 FPS  the same as allocator churn per second at 720p60
+    retained   bytes still allocated after the frame (should stay ~0 once warmed up)
+
+Scenarios: "detector" runs the real HandDetector preprocessing + model on camera-sized
+frames; "render" is the full process_frame with scripted hand input and a placed kite.
+
+Results can be written as JSON and compared against a previous run, like bench_app.py.
+--baseline measures another git revision with this same script (in a temporary worktree),
+so a before / after comparison comes straight from the tool:
+
+    python benchmarks/bench_alloc.py
+    python benchmarks/bench_alloc.py --out alloc.json --compare old.json
+    python benchmarks/bench_alloc.py --baseline 6a40ee3   # before frame buffers were reused
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kite_app import KiteApp
+from hand_tracking import HandDetector
+from scripted import ScriptedHandDetector
+from bench_app import synthetic_frames, hover_path, place_kite, git_commit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def fresh_frames(frames, count):
+    """Frames as a camera delivers them: one new array per frame, allocated outside the measurement."""
+    return [frames[i % len(frames)].copy() for i in range(count)]
+
+def measure(step, inputs, warmup):
+    for img in inputs[:warmup]:
+        step(img)
+
+    transient, retained = [], []
+    tracemalloc.start()
+    for img in inputs[warmup:]:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        step(img)
+        current, peak = tracemalloc.get_traced_memory()
+        transient.append(peak - before)
+        retained.append(current - before)
+    tracemalloc.stop()
+    return {
+        "transient_mb": float(np.mean(transient)) / 2**20,
+        "retained_kb": float(np.mean(retained)) / 1024,
+    }
+
+def detector_step():
+    detector = HandDetector(max_hands=1, inference_scale=0.5)
+    def step(img):
+        detector.find_hands(img, draw=False)
+    return step
+
+def render_step():
+    app = KiteApp(use_camera=False, detector=ScriptedHandDetector(hover_path()))
+    place_kite(app)
+    return app.process_frame
+
+SCENARIOS = {"detector": detector_step, "render": render_step}
+
+def run(frames, warmup):
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+        },
+        "scenarios": {},
+    }
+    source = synthetic_frames()
+    for name, factory in SCENARIOS.items():
+        inputs = fresh_frames(source, warmup + frames)
+        results["scenarios"][name] = measure(factory(), inputs, warmup)
+    return results
+
+def run_baseline(rev, frames, warmup):
+    """Runs this script on the code of another git revision, checked out in a temporary worktree."""
+    with tempfile.TemporaryDirectory(prefix="bench_alloc_") as tmp:
+        tree = os.path.join(tmp, "tree")
+        subprocess.run(["git", "-C", ROOT, "worktree", "add", "--detach", "--quiet", tree, rev], check=True)
+        try:
+            script = os.path.join(tree, "benchmarks", "bench_alloc.py")
+            shutil.copy(os.path.abspath(__file__), script) # Same measurement, old code
+            out = os.path.join(tmp, "baseline.json")
+            subprocess.run([sys.executable, script, "--frames", str(frames), "--warmup", str(warmup), "--out", out],
+                           check=True, stdout=subprocess.DEVNULL)
+            with open(out) as f:
+                return json.load(f)
+        finally:
+            subprocess.run(["git", "-C", ROOT, "worktree", "remove", "--force", tree], check=True)
+
+def print_results(results, baseline=None):
+    print(f"{'scenario':<10}{'transient MB':>14}{'at 60 FPS MB/s':>16}{'retained KB':>13}")
+    for name, r in results["scenarios"].items():
+        line = f"{name:<10}{r['transient_mb']:>14.2f}{r['transient_mb'] * 60:>16.1f}{r['retained_kb']:>13.1f}"
+        old = (baseline or {}).get("scenarios", {}).get(name)
+        if old:
+            line += f"   transient {old['transient_mb']:.2f} -> {r['transient_mb']:.2f} MB vs {baseline['meta'].get('commit')}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON from a previous run to diff against")
+    parser.add_argument("--baseline", metavar="REV", help="git revision to measure and diff against")
+    args = parser.parse_args()
+
+    results = run(args.frames, args.warmup)
+    baseline = None
+    if args.baseline:
+        baseline = run_baseline(args.baseline, args.frames, args.warmup)
+    elif args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
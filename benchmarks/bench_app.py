@@ -0,0 +1,181 @@
+"""
+Headless benchmark for KiteApp.process_frame.
+Frames come from a recorded video (--video) or are synthetic, hand input comes from
+ScriptedHandDetector so runs are deterministic. Results are written as JSON and can be
+compared against a previous run with --compare.
+
+    python benchmarks/bench_app.py --out bench.json
+    python benchmarks/bench_app.py --out new.json --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kite_app import KiteApp
+from ui_components import DraggableObject
+from scripted import Path, ScriptedHandDetector, build_kite_path, two_hand_kite_paths
+
+FRAME_SIZE = (1280, 720)
+SCRIPT_FPS = 30.0
+KITE_CENTER = (640, 360)
+COLORS = [(0, 255, 255), (0, 0, 255), (255, 0, 0), (0, 255, 0), (255, 0, 255)]
+
+def synthetic_frames(count=8, seed=0):
+    """A few noisy gradient frames, enough to defeat any caching on the input side."""
+    rng = np.random.default_rng(seed)
+    w, h = FRAME_SIZE
+    base = np.dstack(np.meshgrid(np.linspace(0, 200, w), np.linspace(0, 120, h)) + [np.full((h, w), 90.0)])
+    return [np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8) for _ in range(count)]
+
+def video_frames(path, limit=300):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        success, img = cap.read()
+        if not success: break
+        frames.append(cv2.resize(img, FRAME_SIZE))
+    cap.release()
+    if not frames:
+        raise SystemExit(f"Could not read any frames from {path}")
+    return frames
+
+def place(app, obj_type, pos, color=None):
+    obj = DraggableObject(len(app.objects), obj_type)
+    obj.pos = pos
+    if color is not None:
+        obj.color = color
+    obj.place()
+    app.scene.add(obj)
+
+def place_kite(app):
+    place(app, 'stick1', KITE_CENTER)
+    place(app, 'stick2', KITE_CENTER)
+    place(app, 'paper', KITE_CENTER, app.kite_color)
+
+def place_many(count):
+    def setup(app):
+        for i in range(count):
+            pos = (320 + (i % 10) * 85, 120 + (i // 10) * 110)
+            place(app, ['stick1', 'stick2', 'paper'][i % 3], pos, COLORS[i % len(COLORS)])
+    return setup
+
+def kite_wall(app):
+    place_kite(app)
+    app.toggle_wall() # 400 kites, 1200 elements
+
+def flight(app):
+    place_kite(app)
+    app.toggle_flight() # The built kite on both hands' manjhas, 24 sky kites
+
+def hover_path():
+    return Path(start=(640, 360)).circle((640, 360), 150, 90).lose(10)
+
+def two_hover_paths():
+    return hover_path(), Path(start=(640, 360)).circle((640, 360), 250, 90)
+
+# name -> (path factory, scene setup, reset the scene every time the path loops)
+# A path factory returning a tuple scripts one hand per path.
+SCENARIOS = {
+    "empty_scene": (hover_path, None, False),
+    "full_kite": (hover_path, place_kite, False),
+    "placed_50": (hover_path, place_many(50), False),
+    "build_kite": (build_kite_path, None, True),
+    "two_hands": (two_hover_paths, place_kite, False),
+    "build_kite_2p": (two_hand_kite_paths, None, True),
+    "kite_wall": (hover_path, kite_wall, False),
+    "flight": (two_hover_paths, flight, False),
+}
+
+def run_scenario(name, frames, count, warmup):
+    path_factory, setup, reset_on_loop = SCENARIOS[name]
+    paths = path_factory()
+    paths = paths if isinstance(paths, tuple) else (paths,)
+    detector = ScriptedHandDetector(*paths)
+    path = paths[0]
+    app = KiteApp(use_camera=False, detector=detector, adaptive_quality=False) # Fixed tier, so runs stay comparable
+    app.clock = lambda: detector.frame_index / SCRIPT_FPS # Filters see the scripted frame rate
+    if setup:
+        setup(app)
+
+    times = []
+    for i in range(warmup + count):
+        if reset_on_loop and i % len(path) == 0:
+            app.handle_button_click("reset", None)
+        img = frames[i % len(frames)].copy() # process_frame mirrors and draws in place
+        start = time.perf_counter()
+        app.process_frame(img)
+        if i >= warmup:
+            times.append(time.perf_counter() - start)
+
+    ms = np.array(times) * 1000
+    return {
+        "frames": count,
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "fps": float(count / ms.sum() * 1000),
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, baseline=None):
+    print(f"{'scenario':<14}{'mean':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'fps':>8}")
+    for name, r in results["scenarios"].items():
+        line = f"{name:<14}{r['mean_ms']:>8.2f}{r['p50_ms']:>8.2f}{r['p95_ms']:>8.2f}{r['p99_ms']:>8.2f}{r['fps']:>8.1f}"
+        old = (baseline or {}).get("scenarios", {}).get(name)
+        if old:
+            line += f"   mean {100 * (r['mean_ms'] / old['mean_ms'] - 1):+.1f}% vs {baseline['meta'].get('commit')}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--video", help="recorded video to use as camera input (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=300, help="measured frames per scenario")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these (repeatable)")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON from a previous run to diff against")
+    args = parser.parse_args()
+
+    frames = video_frames(args.video) if args.video else synthetic_frames()
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "frame_size": FRAME_SIZE,
+            "source": args.video or "synthetic",
+        },
+        "scenarios": {},
+    }
+    for name in args.scenario or SCENARIOS:
+        results["scenarios"][name] = run_scenario(name, frames, args.frames, args.warmup)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark for the blending helpers in utils.py.
+Compares the ROI-bounded helpers against the old full-frame copy + addWeighted
+approach for growing shape sizes on a 1280x720 frame, and the sprite blits
+(overlay_transparent, premultiplied) against the old float64 loop.
+
+    python benchmarks/bench_blend.py
+"""
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import (draw_transparent_rect, draw_glow_line, draw_glow_polyline, draw_transparent_poly,
+                   overlay_transparent, premultiply, blend_premultiplied)
+
+FRAME_SHAPE = (720, 1280, 3)
+SIZES = [16, 64, 256, 700]
+
+def full_frame(draw, alpha):
+    # The pre-ROI implementation: copy and blend the whole frame
+    def run(img):
+        overlay = img.copy()
+        draw(overlay)
+        cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
+    return run
+
+def overlay_float_loop(background, overlay, x, y):
+    # The old overlay_transparent: float64 math, one channel at a time (no negative offsets)
+    h, w = overlay.shape[:2]
+    alpha = overlay[:, :, 3] / 255.0
+    for c in range(0, 3):
+        background[y:y+h, x:x+w, c] = (alpha * overlay[:, :, c] +
+                                      (1.0 - alpha) * background[y:y+h, x:x+w, c])
+    return background
+
+def time_call(fn, img, repeat):
+    fn(img) # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(img)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def cases(size):
+    cx, cy = 640, 360
+    half = size // 2
+    pt1, pt2 = (cx - half, cy - half), (cx + half, cy + half)
+    poly = np.array([(cx, cy - half), (cx + half, cy), (cx, cy + half), (cx - half, cy)], np.int32)
+    zigzag = np.array([(cx - half + i, cy + (10 if (i // 10) % 2 else -10)) for i in range(0, size + 1, 10)], np.int32)
+
+    return {
+        "rect": (lambda img: draw_transparent_rect(img, pt1, pt2, (30, 30, 30), 0.6),
+                 full_frame(lambda o: cv2.rectangle(o, pt1, pt2, (30, 30, 30), -1), 0.6)),
+        "glow_line": (lambda img: draw_glow_line(img, pt1, pt2, (0, 255, 255), 8),
+                      full_frame(lambda o: cv2.line(o, pt1, pt2, (0, 255, 255), 8), 0.4)),
+        "glow_polyline": (lambda img: draw_glow_polyline(img, zigzag, (255, 0, 255), 8),
+                          full_frame(lambda o: cv2.polylines(o, [zigzag], False, (255, 0, 255), 8), 0.4)),
+        "poly": (lambda img: draw_transparent_poly(img, poly, (0, 200, 255), 0.7),
+                 full_frame(lambda o: cv2.fillPoly(o, [poly], (0, 200, 255)), 0.7)),
+    }
+
+def sprite_cases(size, count=50):
+    rng = np.random.default_rng(size)
+    sprite = rng.integers(0, 256, (size, size, 4), np.uint8)
+    color, inv_alpha = premultiply(sprite)
+    positions = [(int(x), int(y)) for x, y in zip(rng.integers(0, 1280 - size, count), rng.integers(0, 720 - size, count))]
+
+    def each(blit):
+        return lambda img: [blit(img, x, y) for x, y in positions]
+    return {
+        "overlay": (each(lambda img, x, y: overlay_transparent(img, sprite, x, y)),
+                    each(lambda img, x, y: overlay_float_loop(img, sprite, x, y))),
+        "premultiplied": (each(lambda img, x, y: blend_premultiplied(img, color, inv_alpha, x, y)),
+                          each(lambda img, x, y: overlay_float_loop(img, sprite, x, y))),
+    }
+
+def main(repeat=200):
+    img = np.random.randint(0, 256, FRAME_SHAPE, np.uint8)
+    print(f"{'shape':<15}{'size':>6}{'roi ms':>10}{'full ms':>10}{'speedup':>9}")
+    for size in SIZES:
+        for name, (roi_fn, full_fn) in cases(size).items():
+            roi_ms = time_call(roi_fn, img, repeat)
+            full_ms = time_call(full_fn, img, repeat)
+            print(f"{name:<15}{size:>6}{roi_ms:>10.3f}{full_ms:>10.3f}{full_ms / roi_ms:>8.1f}x")
+
+    print(f"\n{'50 sprites':<15}{'size':>6}{'new ms':>10}{'old ms':>10}{'speedup':>9}")
+    for size in (32, 128, 256):
+        for name, (new_fn, old_fn) in sprite_cases(size).items():
+            new_ms = time_call(new_fn, img, repeat // 10)
+            old_ms = time_call(old_fn, img, repeat // 10)
+            print(f"{name:<15}{size:>6}{new_ms:>10.3f}{old_ms:>10.3f}{old_ms / new_ms:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
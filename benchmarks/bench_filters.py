@@ -0,0 +1,83 @@
+"""
+Latency / jitter comparison of the cursor filters in cursor_filter.py.
+Replays scripted index-tip traces at 30 FPS with landmark noise and a fixed
+capture-to-display delay, and scores each filter against the true position:
+
+    rmse_px    error against where the finger really is when the frame is shown
+    lag_ms     time shift that best aligns the output with the truth while moving
+    jitter_px  RMS frame-to-frame movement while the hand is held still
+
+    python benchmarks/bench_filters.py
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cursor_filter import CursorFilterBank
+from scripted import Path, build_kite_path
+
+FPS = 30.0
+DELAY_FRAMES = 2 # capture-to-display latency the prediction has to make up for
+NOISE_PX = 2.0
+
+CONFIGS = {
+    "exponential (old)": dict(kind="exponential", predict=False),
+    "one_euro": dict(kind="one_euro", predict=False),
+    "one_euro + predict": dict(kind="one_euro", predict=True),
+    "kalman": dict(kind="kalman", predict=False),
+    "kalman + predict": dict(kind="kalman", predict=True),
+}
+
+def traces():
+    sweeps = (Path(start=(200, 360)).hold(30).move((1100, 360), 25).hold(30)
+              .move((900, 200), 60).hold(30).circle((640, 360), 200, 90).hold(30))
+    return {"sweeps": sweeps, "build_kite": build_kite_path()}
+
+def truth_array(path):
+    """(frames, 2) true cursor positions, hand loss filled with the last position."""
+    pts, last = [], path.pos
+    for state in path.frames:
+        if state is not None:
+            last = state[:2]
+        pts.append(last)
+    return np.array(pts, np.float64)
+
+def run_filter(config, truth, rng):
+    f = CursorFilterBank(1, **config) # One cursor, as the app runs it per hand
+    latency = DELAY_FRAMES / FPS
+    out = np.empty_like(truth)
+    for i in range(len(truth)):
+        measured = truth[max(i - DELAY_FRAMES, 0)] + rng.normal(0, NOISE_PX, 2)
+        out[i] = f(measured[None], i / FPS, latency)[0]
+    return out
+
+def score(out, truth):
+    err = np.linalg.norm(out - truth, axis=1)
+    step = np.linalg.norm(np.diff(truth, axis=0), axis=1)
+    moving = np.flatnonzero(step > 1.0) + 1 # frames where the finger moved since the last one
+    # Still: the finger has not moved for long enough that the delayed input is settled too
+    settle = DELAY_FRAMES + 8
+    still = np.convolve(step == 0, np.ones(settle), "full")[:len(step)] == settle
+
+    # Lag: how many frames back the truth has to be shifted to best match the output while moving
+    costs = [np.linalg.norm(out[moving[moving >= k]] - truth[moving[moving >= k] - k], axis=1).mean()
+             for k in range(10)]
+    jitter = np.linalg.norm(np.diff(out, axis=0), axis=1)[still]
+    return {
+        "rmse_px": float(np.sqrt((err ** 2).mean())),
+        "lag_ms": float(np.argmin(costs) / FPS * 1000),
+        "jitter_px": float(np.sqrt((jitter ** 2).mean())) if still.any() else 0.0,
+    }
+
+def main(seed=0):
+    print(f"delay {DELAY_FRAMES / FPS * 1000:.0f} ms, noise {NOISE_PX} px")
+    print(f"{'trace':<12}{'filter':<22}{'rmse px':>9}{'lag ms':>8}{'jitter px':>11}")
+    for name, path in traces().items():
+        truth = truth_array(path)
+        for label, config in CONFIGS.items():
+            s = score(run_filter(config, truth, np.random.default_rng(seed)), truth)
+            print(f"{name:<12}{label:<22}{s['rmse_px']:>9.2f}{s['lag_ms']:>8.0f}{s['jitter_px']:>11.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Kite flight physics against its per-frame budget: steps FlightSim (kite_flight.py) headlessly
+for several kites x manjha nodes x tail nodes sizes at a fixed frame rate and reports the
+time per frame (all substeps plus the wind update), with the hand anchors moving.
+
+    python benchmarks/bench_physics.py
+    python benchmarks/bench_physics.py --size 64x256x64 --fps 60 --iterations 3
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kite_flight import FlightSim
+
+# kites x manjha nodes x tail nodes: the app's flight mode (2 hand + 24 sky kites), then dozens of long kites
+SIZES = ["26x48x16", "24x200x40", "48x200x40", "32x256x64"]
+
+def measure(kites, rope_nodes, tail_nodes, fps, frames, warmup, iterations, substep_hz):
+    rng = np.random.default_rng(0)
+    sim = FlightSim(kites, rope_nodes, tail_nodes, rope_length=rng.uniform(250, 500, kites), tail_length=120,
+                    iterations=iterations, substep_hz=substep_hz)
+    base = np.stack([np.linspace(0, 1200, kites), np.full(kites, 700.0)], axis=1)
+    sim.reset(base)
+
+    times, substeps = [], 0
+    for i in range(warmup + frames):
+        t = i / fps
+        sim.anchor[:] = base + 60 * np.array([np.sin(t), 0.5 * np.cos(1.7 * t)]) # Hands moving the anchors
+        start = time.perf_counter()
+        n = sim.step(t)
+        if i >= warmup:
+            times.append(time.perf_counter() - start)
+            substeps += n
+    if not np.isfinite(sim.positions()).all():
+        raise SystemExit(f"{kites}x{rope_nodes}x{tail_nodes}: simulation blew up")
+    return np.array(times) * 1000, substeps / frames
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", action="append", help="kites x manjha nodes x tail nodes, e.g. 48x200x40 (repeatable)")
+    parser.add_argument("--fps", type=float, default=30.0, help="render frame rate the physics is stepped at")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--iterations", type=int, default=2, help="constraint passes per substep")
+    parser.add_argument("--substep-hz", type=float, default=120.0)
+    parser.add_argument("--budget", type=float, default=5.0, help="ms per frame")
+    args = parser.parse_args()
+
+    print(f"{'kites x nodes':<16}{'particles':>10}{'substeps':>10}{'mean':>9}{'p95':>9}{'max':>9}")
+    for size in args.size or SIZES:
+        kites, rope_nodes, tail_nodes = map(int, size.split("x"))
+        ms, substeps = measure(kites, rope_nodes, tail_nodes, args.fps, args.frames, args.warmup,
+                               args.iterations, args.substep_hz)
+        p95 = np.percentile(ms, 95)
+        verdict = "ok" if p95 <= args.budget else f"over the {args.budget:g} ms budget"
+        print(f"{size:<16}{kites * (rope_nodes + tail_nodes):>10}{substeps:>10.1f}{ms.mean():>7.2f}ms"
+              f"{p95:>7.2f}ms{ms.max():>7.2f}ms  {verdict}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Load test for the web app's inference setup: N synthetic sessions, each a KiteApp driven
+from its own thread at a target frame rate, like streamlit-webrtc's per-session workers.
+
+    shared     all sessions go through one InferenceService (what web_app.py does)
+    dedicated  every session builds its own HandDetector / MediaPipe graph (the old web app)
+
+Reports per-session FPS, frame latency, fairness (slowest / fastest session) and drops.
+
+    python benchmarks/load_test.py --sessions 1 2 4 8
+    python benchmarks/load_test.py --sessions 8 --mode dedicated
+"""
+import argparse
+import os
+import resource
+import sys
+import threading
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kite_app import KiteApp
+from hand_tracking import HandDetector
+from inference_service import InferenceService, SharedHandDetector
+from bench_app import synthetic_frames, video_frames
+
+def run_session(app, frames, fps, seconds, start_barrier, out):
+    start_barrier.wait()
+    interval = 1.0 / fps
+    latencies = []
+    begin = next_frame = time.perf_counter()
+    i = 0
+    while next_frame - begin < seconds:
+        now = time.perf_counter()
+        if now < next_frame:
+            time.sleep(next_frame - now)
+        start = time.perf_counter()
+        app.process_frame(frames[i % len(frames)].copy())
+        latencies.append(time.perf_counter() - start)
+        i += 1
+        # A session that falls behind skips the frames it missed, like a live stream would
+        next_frame = max(next_frame + interval, time.perf_counter())
+    out.append((len(latencies) / (time.perf_counter() - begin), latencies))
+
+def run(sessions, mode, workers, fps, seconds, frames):
+    service = InferenceService(workers=workers, max_hands=1).start() if mode == "shared" else None
+    apps = []
+    for _ in range(sessions):
+        if service:
+            detector = SharedHandDetector(service, max_hands=1, inference_scale=0.5, roi_tracking=True)
+        else:
+            detector = HandDetector(max_hands=1, inference_scale=0.5)
+        apps.append(KiteApp(use_camera=False, detector=detector))
+
+    barrier = threading.Barrier(sessions)
+    results = []
+    threads = [threading.Thread(target=run_session, args=(app, frames, fps, seconds, barrier, results))
+               for app in apps]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    session_fps = np.array([r[0] for r in results])
+    ms = np.concatenate([r[1] for r in results]) * 1000
+    row = {
+        "sessions": sessions,
+        "fps_mean": float(session_fps.mean()),
+        "fairness": float(session_fps.min() / session_fps.max()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "dropped": 0,
+    }
+    if service:
+        stats = service.stats()
+        row["dropped"] = stats["stale"] + stats["replaced"]
+        for app in apps:
+            app.detector.close()
+        service.stop()
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--mode", choices=["shared", "dedicated"], default="shared")
+    parser.add_argument("--workers", type=int, default=2, help="inference workers (shared mode)")
+    parser.add_argument("--fps", type=float, default=30.0, help="target frame rate per session")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--video", help="recorded video to use as camera input (default: synthetic frames)")
+    args = parser.parse_args()
+
+    frames = video_frames(args.video) if args.video else synthetic_frames()
+    print(f"mode {args.mode}, target {args.fps:.0f} FPS per session"
+          + (f", {args.workers} workers" if args.mode == "shared" else ""))
+    print(f"{'sessions':>8}{'fps':>8}{'fairness':>10}{'p50 ms':>9}{'p95 ms':>9}{'dropped':>9}{'peak MB':>9}")
+    for n in args.sessions:
+        r = run(n, args.mode, args.workers, args.fps, args.seconds, frames)
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # KB on Linux
+        print(f"{n:>8}{r['fps_mean']:>8.1f}{r['fairness']:>10.2f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+              f"{r['dropped']:>9}{peak_mb:>9.0f}")
+
+if __name__ == "__main__":
+    main()
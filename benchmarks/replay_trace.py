@@ -0,0 +1,68 @@
+"""
+Replays a landmark trace (python kite_app.py --record-trace session.trace) through
+KiteApp.process_frame, without camera or MediaPipe. The gesture filters see the recorded
+timestamps and latency, so a session plays out exactly as it did live, at any speed.
+
+    python benchmarks/replay_trace.py session.trace --show --speed 0.25   # watch a gesture bug in slow motion
+    python benchmarks/replay_trace.py session.trace --start 1200 --frames 300
+    python benchmarks/replay_trace.py session.trace                       # per-stage profile, as fast as possible
+
+Frames are synthetic (or from --video, looped), only the hand input comes from the trace.
+"""
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kite_app import KiteApp
+from landmark_trace import TraceReplayDetector
+from bench_app import synthetic_frames, video_frames
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("trace")
+    parser.add_argument("--video", help="background frames (default: synthetic)")
+    parser.add_argument("--start", type=int, default=0, help="first frame to render (earlier ones only drive the gestures)")
+    parser.add_argument("--frames", type=int, help="frames to render (default: to the end of the trace)")
+    parser.add_argument("--show", action="store_true", help="display the frames")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed with --show, 0 = as fast as possible")
+    args = parser.parse_args()
+
+    detector = TraceReplayDetector(args.trace)
+    app = KiteApp(use_camera=False, detector=detector, profile=True, warm_up=False, adaptive_quality=False)
+    app.clock = detector.clock
+    frames = video_frames(args.video) if args.video else synthetic_frames()
+    stop = len(detector) if args.frames is None else min(len(detector), args.start + args.frames)
+
+    app.replay_gestures(args.start, frames[0].shape)
+
+    times = []
+    shown_at = None
+    for i in range(args.start, stop):
+        start = time.perf_counter()
+        img, results, _ = app.infer_frame(frames[i % len(frames)].copy())
+        app.latency = float(results["latency"]) # Cursor prediction as it was live
+        img = app.render_frame(img, results)
+        times.append(time.perf_counter() - start)
+
+        if args.show:
+            if shown_at is not None and args.speed > 0:
+                # Wait out the recorded frame interval, scaled by speed
+                t = detector.trace["t"]
+                delay = (t[i] - t[i - 1]) / args.speed - (time.perf_counter() - shown_at)
+                if delay > 0: time.sleep(delay)
+            cv2.imshow("Trace replay", img)
+            shown_at = time.perf_counter()
+            if cv2.waitKey(1) & 0xFF == 27: break
+    app.close()
+
+    ms = np.array(times) * 1000
+    print(f"{len(ms)} frames of {args.trace}: mean {ms.mean():.2f} ms, p95 {np.percentile(ms, 95):.2f} ms")
+    for name, stage in app.profiler.stage_ms().items():
+        print(f"  {name:<14}{stage:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
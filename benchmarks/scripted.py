@@ -0,0 +1,120 @@
+"""
+Scripted hand input for headless runs: a HandDetector that replays landmark paths
+(pinches, drags, drops, hand loss) instead of running MediaPipe on the frame.
+"""
+import os
+import sys
+from types import SimpleNamespace
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hand_tracking import HandDetector
+
+# Open hand pointing up, in pixels relative to the index finger tip (landmark 8)
+HAND_TEMPLATE = np.array([
+    (-20, 220),                                          # 0 wrist
+    (-60, 190), (-90, 160), (-105, 130), (-110, 90),     # 1-4 thumb
+    (0, 120), (0, 80), (0, 40), (0, 0),                  # 5-8 index
+    (30, 120), (32, 75), (33, 40), (34, 10),             # 9-12 middle
+    (55, 130), (58, 90), (60, 60), (60, 35),             # 13-16 ring
+    (80, 145), (83, 115), (85, 90), (85, 70),            # 17-20 pinky
+], np.float32)
+PINCHED_THUMB_TIP = np.array((-8, 6), np.float32) # 10 px from the index tip
+
+def hand_landmarks(x, y, pinch=0.0):
+    """21 (x, y) pixel landmarks with the index tip at (x, y); pinch 0 = open, 1 = closed."""
+    pts = HAND_TEMPLATE.copy()
+    pts[4] = pts[4] + (PINCHED_THUMB_TIP - pts[4]) * pinch
+    return pts + (x, y)
+
+class Path:
+    """
+    Piecewise linear hand path built from segments. Each frame maps to (x, y, pinch) or None
+    when the hand is out of view.
+    """
+    def __init__(self, start=(640, 360)):
+        self.frames = []
+        self.pos = start
+
+    def move(self, to, frames, pinch=0.0):
+        (x0, y0), (x1, y1) = self.pos, to
+        for i in range(1, frames + 1):
+            t = i / frames
+            self.frames.append((x0 + (x1 - x0) * t, y0 + (y1 - y0) * t, pinch))
+        self.pos = to
+        return self
+
+    def hold(self, frames, pinch=0.0):
+        return self.move(self.pos, frames, pinch)
+
+    def pinch(self, frames=6):
+        return self.hold(frames, 1.0)
+
+    def release(self, frames=6):
+        return self.hold(frames, 0.0)
+
+    def lose(self, frames):
+        self.frames.extend([None] * frames)
+        return self
+
+    def circle(self, center, radius, frames, pinch=0.0):
+        for i in range(frames):
+            a = 2 * np.pi * i / frames
+            self.frames.append((center[0] + radius * np.cos(a), center[1] + radius * np.sin(a), pinch))
+        self.pos = self.frames[-1][:2]
+        return self
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, i):
+        return self.frames[i % len(self.frames)]
+
+class ScriptedHandDetector(HandDetector):
+    """Drop-in HandDetector whose detect() replays one Path per hand instead of running the model."""
+    def __init__(self, path, *more_paths, **kwargs):
+        kwargs.setdefault("max_hands", 1 + len(more_paths))
+        super().__init__(**kwargs)
+        self.paths = [path, *more_paths]
+        self.frame_index = 0
+
+    def warm_up(self, frame_shape=(720, 1280, 3)):
+        return {} # No model
+
+    @property
+    def path(self):
+        return self.paths[0]
+
+    def detect(self, img):
+        states = [path[self.frame_index] for path in self.paths]
+        self.frame_index += 1
+        hands = []
+        h, w = img.shape[:2]
+        for state in states:
+            if state is None: continue
+            # Shaped like mediapipe's NormalizedLandmarkList, so mediapipe is never imported
+            hands.append(SimpleNamespace(landmark=[SimpleNamespace(x=float(px) / w, y=float(py) / h, z=0.0)
+                                                   for px, py in hand_landmarks(*state)]))
+        return SimpleNamespace(multi_hand_landmarks=hands or None, multi_handedness=None)
+
+def build_kite_path():
+    """Grab both sticks and the paper from the sidebar, place them, paint the kite, lose the hand."""
+    path = Path(start=(640, 360))
+    center = (640, 360)
+    for button in [(110, 130), (110, 210), (110, 290)]: # Stick 1, Stick 2, Paper
+        path.move(button, 20).pinch().move(center, 30, pinch=1.0).release()
+    path.move((1175, 125), 25).pinch().move(center, 30, pinch=1.0).release() # Yellow color blob
+    path.move((900, 400), 20).lose(20).hold(10)
+    return path
+
+def two_hand_kite_paths():
+    """Two players: one places the sticks while the other fetches the paper and then the paint."""
+    left = Path(start=(400, 360))
+    left.move((110, 130), 20).pinch().move((560, 360), 30, pinch=1.0).release()
+    left.move((110, 210), 20).pinch().move((640, 360), 30, pinch=1.0).release()
+    left.move((400, 500), 40)
+    right = Path(start=(900, 360))
+    right.hold(110).move((110, 290), 30).pinch().move((640, 360), 30, pinch=1.0).release()
+    right.move((1175, 125), 25).pinch().move((640, 360), 30, pinch=1.0).release().hold(5)
+    left.hold(len(right) - len(left))
+    return left, right
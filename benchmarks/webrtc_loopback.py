@@ -0,0 +1,138 @@
+"""
+WebRTC loopback test for the web app's KiteVideoProcessor, no browser needed.
+An aiortc client peer streams synthetic camera frames to an in-process server peer, which
+runs them through streamlit-webrtc's processing track (the same one webrtc_streamer uses)
+and sends the result back. Hand input is scripted, --delay makes processing artificially slow.
+
+Every sent frame carries its id as a strip of black / white blocks, so the client can tell
+which camera frame each returned frame was rendered from and measure the end-to-end latency.
+
+    python benchmarks/webrtc_loopback.py --seconds 10 --delay 80
+    python benchmarks/webrtc_loopback.py --seconds 10 --delay 80 --mode sync   # inline processing, for comparison
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import numpy as np
+from aiortc import RTCPeerConnection, VideoStreamTrack
+from av import VideoFrame
+from streamlit_webrtc.process import AsyncVideoProcessTrack, VideoProcessTrack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kite_app import KiteApp
+from webrtc_processor import KiteVideoProcessor
+from scripted import ScriptedHandDetector
+from bench_app import synthetic_frames, hover_path
+
+ID_BITS = 16
+BLOCK = 16 # px per bit, large enough to survive VP8
+
+def stamp_id(img, frame_id):
+    """Writes frame_id into the bottom-left corner (bottom-right once the app mirrors the frame)."""
+    h = img.shape[0]
+    for bit in range(ID_BITS):
+        img[h - BLOCK:, bit * BLOCK:(bit + 1) * BLOCK] = 255 if frame_id >> bit & 1 else 0
+
+def read_id(img, mirrored=True):
+    h, w = img.shape[:2]
+    frame_id = 0
+    for bit in range(ID_BITS):
+        x = w - (bit + 1) * BLOCK if mirrored else bit * BLOCK
+        if img[h - BLOCK + 4:h - 4, x + 4:x + BLOCK - 4].mean() > 128:
+            frame_id |= 1 << bit
+    return frame_id
+
+class CameraTrack(VideoStreamTrack):
+    """Synthetic 30 FPS camera, remembering when each frame id was sent."""
+    def __init__(self, frames):
+        super().__init__()
+        self.frames = frames
+        self.sent = {}
+        self.next_id = 0
+
+    async def recv(self):
+        pts, time_base = await self.next_timestamp()
+        frame_id = self.next_id
+        self.next_id = (self.next_id + 1) % (1 << ID_BITS)
+        img = self.frames[frame_id % len(self.frames)].copy()
+        stamp_id(img, frame_id)
+        frame = VideoFrame.from_ndarray(img, format="bgr24")
+        frame.pts, frame.time_base = pts, time_base
+        self.sent[frame_id] = time.perf_counter()
+        return frame
+
+def make_processor(delay):
+    app = KiteApp(use_camera=False, detector=ScriptedHandDetector(hover_path()), warm_up=False)
+    if delay:
+        process_frame = app.process_frame
+        def slow_process_frame(img):
+            time.sleep(delay)
+            return process_frame(img)
+        app.process_frame = slow_process_frame
+    return KiteVideoProcessor(app)
+
+async def run(args):
+    camera = CameraTrack(synthetic_frames())
+    processor = make_processor(args.delay / 1000)
+    client, server = RTCPeerConnection(), RTCPeerConnection()
+    client.addTrack(camera) # sendrecv: the processed track comes back on the same transceiver
+
+    @server.on("track")
+    def on_track(track):
+        track_type = AsyncVideoProcessTrack if args.mode == "async" else VideoProcessTrack
+        server.addTrack(track_type(track, processor))
+
+    received = []
+    done = asyncio.Event()
+
+    @client.on("track")
+    def on_result(track):
+        async def consume():
+            start = time.perf_counter()
+            while time.perf_counter() - start < args.seconds:
+                frame = await track.recv()
+                now = time.perf_counter()
+                frame_id = read_id(frame.to_ndarray(format="bgr24"))
+                sent = camera.sent.get(frame_id)
+                if sent is not None:
+                    received.append((now, frame_id, now - sent))
+            done.set()
+        asyncio.ensure_future(consume())
+
+    # In-process signaling
+    await client.setLocalDescription(await client.createOffer())
+    await server.setRemoteDescription(client.localDescription)
+    await server.setLocalDescription(await server.createAnswer())
+    await client.setRemoteDescription(server.localDescription)
+
+    await asyncio.wait_for(done.wait(), args.seconds + 30)
+    await client.close()
+    await server.close()
+    return received, processor
+
+def report(received, processor, seconds):
+    if not received:
+        print("No frames came back")
+        return
+    times, ids, latency = map(np.array, zip(*received))
+    new = np.concatenate([[True], ids[1:] != ids[:-1]]) # Frames rendered from a new camera frame
+    lat_ms = latency[new] * 1000
+    third = max(1, len(lat_ms) // 3)
+    print(f"received {len(ids) / seconds:5.1f} FPS, new renders {new.sum() / seconds:5.1f} FPS")
+    print(f"latency  p50 {np.percentile(lat_ms, 50):6.0f} ms   p95 {np.percentile(lat_ms, 95):6.0f} ms   "
+          f"first third {lat_ms[:third].mean():6.0f} ms -> last third {lat_ms[-third:].mean():6.0f} ms")
+    print("processor", processor.stats())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["async", "sync"], default="async")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--delay", type=float, default=0.0, help="extra processing time per frame (ms)")
+    args = parser.parse_args()
+    received, processor = asyncio.run(run(args))
+    report(received, processor, args.seconds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import math
+import numpy as np
+
+def _alpha(cutoff, dt):
+    """Smoothing factor of a first-order low-pass with the given cutoff (Hz) over dt seconds."""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+class _FilterBank:
+    """
+    n independent filter tracks updated in one vectorized step (struct-of-arrays):
+    x and dx are (n, dims). A track starts on its first masked update and can be reset
+    on its own. A single cursor is a bank with n=1.
+    """
+    def __init__(self, n, dims=2):
+        self.x = np.zeros((n, dims))
+        self.dx = np.zeros((n, dims))
+        self.t = np.zeros(n)
+        self.live = np.zeros(n, bool)
+
+    def reset(self, mask=None):
+        self.live[slice(None) if mask is None else mask] = False
+
+    def __call__(self, values, t, mask=None):
+        """Updates the tracks selected by mask (all by default) with values (n, dims); returns x."""
+        mask = np.ones(len(self.x), bool) if mask is None else np.asarray(mask, bool)
+        values = np.asarray(values, np.float64).reshape(self.x.shape)
+
+        start = mask & ~self.live
+        if start.any():
+            self.x[start] = values[start]
+            self.dx[start] = 0.0
+            self.t[start] = t
+            self._start(start)
+
+        step = mask & self.live & (t > self.t)
+        if step.any():
+            dt = (t - self.t[step])[:, None]
+            self._step(step, values[step], dt)
+            self.t[step] = t
+        self.live |= mask
+        return self.x
+
+    def predict(self, dt):
+        return self.x + self.dx * dt
+
+    def _start(self, rows):
+        pass
+
+class ExponentialBank(_FilterBank):
+    """The old fixed-alpha smoothing: new = alpha * raw + (1 - alpha) * prev."""
+    def __init__(self, n, dims=2, alpha=0.5):
+        super().__init__(n, dims)
+        self.alpha = alpha
+
+    def _step(self, rows, values, dt):
+        x = self.alpha * values + (1 - self.alpha) * self.x[rows]
+        self.dx[rows] = (x - self.x[rows]) / dt
+        self.x[rows] = x
+
+class OneEuroBank(_FilterBank):
+    """
+    One Euro filter (Casiez et al. 2012): a low-pass whose cutoff rises with speed,
+    so slow movements are smoothed hard and fast ones get little lag.
+    """
+    def __init__(self, n, dims=2, min_cutoff=1.0, beta=0.02, d_cutoff=1.0):
+        super().__init__(n, dims)
+        self.min_cutoff = min_cutoff # Hz, smoothing when still
+        self.beta = beta # how fast the cutoff grows with speed
+        self.d_cutoff = d_cutoff # Hz, smoothing of the speed estimate
+
+    def _step(self, rows, values, dt):
+        x, dx = self.x[rows], self.dx[rows]
+        a_d = _alpha(self.d_cutoff, dt)
+        dx = a_d * (values - x) / dt + (1 - a_d) * dx
+
+        # Cutoff from each track's own speed
+        cutoff = self.min_cutoff + self.beta * np.linalg.norm(dx, axis=1, keepdims=True)
+        a = _alpha(cutoff, dt)
+        self.x[rows] = a * values + (1 - a) * x
+        self.dx[rows] = dx
+
+class KalmanBank(_FilterBank):
+    """Per-track constant-velocity Kalman; the (symmetric) 2x2 covariance is kept as P00, P01, P11."""
+    def __init__(self, n, dims=2, process_noise=2000.0, measurement_noise=4.0):
+        super().__init__(n, dims)
+        self.q = process_noise # acceleration noise spectral density (units^2 / s^3)
+        self.r = measurement_noise # measurement variance (units^2)
+        self.P = np.zeros((n, 3))
+
+    def _start(self, rows):
+        self.P[rows] = (self.r, 0.0, 1e4)
+
+    def _step(self, rows, values, dt):
+        p00, p01, p11 = (self.P[rows, i:i+1] for i in range(3))
+        q = self.q
+
+        # Predict
+        x = self.x[rows] + self.dx[rows] * dt
+        p00 = p00 + 2 * dt * p01 + dt * dt * p11 + q * dt**3 / 3
+        p01 = p01 + dt * p11 + q * dt**2 / 2
+        p11 = p11 + q * dt
+
+        # Update with the measured position
+        k_pos, k_vel = p00 / (p00 + self.r), p01 / (p00 + self.r)
+        residual = values - x
+        self.x[rows] = x + k_pos * residual
+        self.dx[rows] = self.dx[rows] + k_vel * residual
+        self.P[rows] = np.hstack(((1 - k_pos) * p00, (1 - k_pos) * p01, p11 - k_vel * p01))
+
+FILTER_BANKS = {
+    "exponential": ExponentialBank,
+    "one_euro": OneEuroBank,
+    "kalman": KalmanBank,
+}
+
+def make_filter_bank(kind="one_euro", n=1, dims=2, **params):
+    """Builds a filter bank for n tracks by name (see FILTER_BANKS)."""
+    if kind not in FILTER_BANKS:
+        raise ValueError(f"Unknown filter {kind!r}, expected one of {sorted(FILTER_BANKS)}")
+    return FILTER_BANKS[kind](n, dims, **params)
+
+class CursorFilterBank:
+    """
+    Filters n cursor positions and predicts them forward by the pipeline latency, so things
+    dragged with the hand sit under the finger instead of trailing it. Returns an (n, 2) int array.
+    """
+    def __init__(self, n, kind="one_euro", predict=True, max_prediction=0.1, **params):
+        self.filter = make_filter_bank(kind, n, 2, **params)
+        self.predict = predict
+        self.max_prediction = max_prediction # seconds, limits overshoot on sudden stops
+        self.out = np.zeros((n, 2), np.int32)
+
+    def reset(self, mask=None):
+        self.filter.reset(mask)
+
+    def __call__(self, positions, t, latency=0.0, mask=None):
+        self.filter(positions, t, mask)
+        if self.predict and latency > 0:
+            pos = self.filter.predict(min(latency, self.max_prediction))
+        else:
+            pos = self.filter.x
+        np.rint(pos, out=self.out, casting="unsafe")
+        return self.out
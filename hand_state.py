@@ -0,0 +1,119 @@
+import numpy as np
+from cursor_filter import CursorFilterBank, make_filter_bank
+from hand_tracking import NUM_LANDMARKS
+
+class HandStates:
+    """
+    Interaction state of up to n hands as struct-of-arrays, one slot per hand identity.
+
+    update() matches this frame's detections to slots by mean landmark distance, so a slot
+    follows the same hand across frames (and across short detection drops, up to max_lost
+    seconds), then filters all cursors and pinch distances and runs the pinch hysteresis
+    for every slot in one vectorized step. Only grab / drop actions are handled per hand.
+    """
+    def __init__(self, n, cursor_filter="one_euro", pinch_on=30.0, pinch_off=50.0,
+                 match_distance=150.0, max_lost=1.0):
+        self.n = n
+        self.pinch_on = pinch_on # pinch starts below this thumb-index distance (px)...
+        self.pinch_off = pinch_off # ...and only ends above this one (hysteresis)
+        self.match_distance = match_distance # mean landmark distance (px) still counted as the same hand
+        self.max_lost = max_lost # seconds a slot keeps its identity without a detection
+
+        self.alive = np.zeros(n, bool) # slot has an identity (visible or recently lost)
+        self.active = np.zeros(n, bool) # hand detected this frame
+        self.detection = np.full(n, -1) # detection index per slot this frame
+        self.last_seen = np.zeros(n)
+        self.landmarks = np.zeros((n, NUM_LANDMARKS, 2), np.float32) # last matched landmarks (px)
+        self.cursor = np.zeros((n, 2), np.int32) # filtered + latency-compensated index tip
+        self.pinch_length = np.zeros(n)
+        self.pinching = np.zeros(n, bool)
+        self.held = np.full(n, None, object) # DraggableObject held by each hand
+
+        self.cursor_filter = CursorFilterBank(n, cursor_filter)
+        self.pinch_filter = make_filter_bank("one_euro", n, 1, min_cutoff=3.0, beta=0.05)
+
+    def primary(self):
+        """Slot of the first visible hand (else the first tracked one, else 0); mouse actions go to it."""
+        for mask in (self.active, self.alive):
+            slots = np.flatnonzero(mask)
+            if len(slots):
+                return int(slots[0])
+        return 0
+
+    def update(self, hands_px, now, latency=0.0):
+        """
+        hands_px is the (num_hands, 21, 2) pixel landmarks of this frame's detections.
+        Returns the slots whose identity ended (lost for longer than max_lost, or taken over
+        by a new hand), whose held objects the caller has to drop.
+        """
+        pts = np.asarray(hands_px, np.float32)
+        new = self._match(pts)
+        ended = new & self.alive
+        self.active = self.detection >= 0
+        if new.any():
+            self.pinching[new] = False
+            self.cursor_filter.reset(new)
+            self.pinch_filter.reset(new)
+
+        # Identities that have not been seen for too long are freed
+        expired = self.alive & ~self.active & (now - self.last_seen > self.max_lost)
+        self.alive &= ~expired
+        ended |= expired
+        self.alive |= self.active
+        self.last_seen[self.active] = now
+
+        # Filters restart when a hand reappears, the pinch state survives short drops
+        self.cursor_filter.reset(~self.active)
+        self.pinch_filter.reset(~self.active)
+        if not self.active.any():
+            return np.flatnonzero(ended)
+
+        slots = np.flatnonzero(self.active)
+        matched = pts[self.detection[slots]]
+        self.landmarks[slots] = matched
+
+        raw = np.zeros((self.n, 2))
+        raw[slots] = matched[:, 8]
+        self.cursor = self.cursor_filter(raw, now, latency, self.active)
+
+        # Pinch: thumb tip (4) to index tip (8), filtered so the hysteresis sees a clean signal
+        length = np.zeros((self.n, 1))
+        length[slots, 0] = np.linalg.norm(matched[:, 4] - matched[:, 8], axis=1)
+        self.pinch_length = self.pinch_filter(length, now, self.active)[:, 0]
+        start = self.active & ~self.pinching & (self.pinch_length < self.pinch_on)
+        stop = self.active & self.pinching & (self.pinch_length > self.pinch_off)
+        self.pinching = (self.pinching | start) & ~stop
+        return np.flatnonzero(ended)
+
+    def _match(self, pts):
+        """Assigns detections to slots (closest pairs first). Returns the mask of slots that got a new identity."""
+        self.detection[:] = -1
+        new = np.zeros(self.n, bool)
+        m = len(pts)
+        if m == 0:
+            return new
+
+        taken = np.zeros(m, bool)
+        known = np.flatnonzero(self.alive)
+        if len(known):
+            cost = np.linalg.norm(pts[:, None] - self.landmarks[None, known], axis=-1).mean(axis=-1)
+            for flat in np.argsort(cost, axis=None):
+                d, k = divmod(int(flat), len(known))
+                if cost[d, k] > self.match_distance: break
+                slot = known[k]
+                if taken[d] or self.detection[slot] >= 0: continue
+                self.detection[slot] = d
+                taken[d] = True
+
+        # Unmatched detections are new hands: free slots first, then the longest-lost identity
+        for d in np.flatnonzero(~taken):
+            free = np.flatnonzero(~self.alive & (self.detection < 0))
+            if len(free):
+                slot = free[0]
+            else:
+                lost = np.flatnonzero(self.detection < 0)
+                if not len(lost): break
+                slot = lost[np.argmin(self.last_seen[lost])]
+            self.detection[slot] = d
+            new[slot] = True
+        return new
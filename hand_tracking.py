@@ -1,60 +1,380 @@
 import cv2
-import mediapipe as mp
 import math
+import time
+from collections import deque
+from types import SimpleNamespace
+import numpy as np
+from profiler import Profiler
+from utils import ScratchBuffer
+
+NUM_LANDMARKS = 21
+# Same topology as mediapipe's HAND_CONNECTIONS, for drawing without importing it
+HAND_CONNECTIONS = ((0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8), (5, 9), (9, 10), (10, 11),
+                    (11, 12), (9, 13), (13, 14), (14, 15), (15, 16), (13, 17), (0, 17), (17, 18), (18, 19), (19, 20))
+
+_mediapipe = None
+
+def import_mediapipe():
+    """Imports mediapipe on first use: it takes about a second, and scripted / shared detectors never need it."""
+    global _mediapipe
+    if _mediapipe is None:
+        import mediapipe
+        _mediapipe = mediapipe
+    return _mediapipe
+
+def draw_hand_landmarks(img, hand):
+    """
+    Draws one hand's normalized (21, 2+) landmarks in mediapipe's default style (white
+    connections, red points with a white border), without needing mediapipe.
+    """
+    h, w = img.shape[:2]
+    px = {}
+    for i, (x, y) in enumerate(hand[:, :2].tolist()):
+        if 0.0 <= x <= 1.0 and 0.0 <= y <= 1.0: # Off-frame points are skipped, as in mediapipe
+            px[i] = (min(math.floor(x * w), w - 1), min(math.floor(y * h), h - 1))
+    for a, b in HAND_CONNECTIONS:
+        if a in px and b in px:
+            cv2.line(img, px[a], px[b], (224, 224, 224), 2)
+    for p in px.values():
+        cv2.circle(img, p, 3, (224, 224, 224), 2)
+        cv2.circle(img, p, 2, (0, 0, 255), 2)
+
+class LandmarkList:
+    """
+    Read-only [id, x, y] view over one hand of HandDetector.landmarks_px,
+    so code written against the old list of lists keeps working.
+    """
+    __slots__ = ("px", "size")
+
+    def __init__(self, px, size):
+        self.px = px
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if not -self.size <= i < self.size:
+            raise IndexError("landmark index out of range")
+        i %= self.size
+        return [i, int(self.px[i, 0]), int(self.px[i, 1])]
+
+    def __iter__(self):
+        return (self[i] for i in range(self.size))
 
 class HandDetector:
-    def __init__(self, mode=False, max_hands=1, detection_con=0.7, track_con=0.7):
+    def __init__(self, mode=False, max_hands=1, detection_con=0.7, track_con=0.7,
+                 inference_scale=1.0, roi_tracking=False, roi_margin=0.3,
+                 infer_every=1, motion_threshold=6.0, max_extrapolation=0.1, profiler=None):
         self.mode = mode
         self.max_hands = max_hands
         self.detection_con = detection_con
         self.track_con = track_con
         
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=self.mode,
-            max_num_hands=self.max_hands,
-            min_detection_confidence=self.detection_con,
-            min_tracking_confidence=self.track_con
-        )
-        self.mp_draw = mp.solutions.drawing_utils
+        # inference_scale < 1 runs the model on a downscaled copy of the frame.
+        # roi_tracking crops around the last known hand and falls back to the full frame when it is lost.
+        self.inference_scale = inference_scale
+        self.roi_tracking = roi_tracking
+        self.roi_margin = roi_margin
+        self.roi = None # (x0, y0, x1, y1) in frame pixels, None = full-frame search
+        
+        # Adaptive frame skipping: the model runs every infer_every frames (can be changed at any time),
+        # or earlier when the frame changed more than motion_threshold (mean abs diff on a thumbnail).
+        # Skipped frames get landmarks extrapolated from the last two inferences.
+        self.infer_every = infer_every
+        self.motion_threshold = motion_threshold
+        self.base_quality = (inference_scale, infer_every) # What set_quality scales from
+        self.max_extrapolation = max_extrapolation # seconds
+        self.frames_since_inference = 0
+        self.motion_thumb = None
+        self.last_inference = None # (time, results, normalized xy array)
+        self.prev_inference = None
+        self.inference_times = deque(maxlen=120)
+        self.frame_times = deque(maxlen=120)
+        
+        self.profiler = profiler or Profiler() # Disabled unless one is passed in
+        self.scratch = ScratchBuffer() # Model input (resized / RGB crop), reused every frame
+        
+        self._hands = None # MediaPipe graph, built on first use (see the hands property)
         self.tip_ids = [4, 8, 12, 16, 20]
-        self.lm_list = []
+        
+        # Landmarks of all detected hands, preallocated and refilled in place every frame:
+        # landmarks is normalized (x, y, z), landmarks_px the matching pixel coordinates.
+        self.landmarks = np.zeros((self.max_hands, NUM_LANDMARKS, 3), np.float32)
+        self.landmarks_px = np.zeros((self.max_hands, NUM_LANDMARKS, 2), np.int32)
+        self.num_hands = 0
+        self.hand_no = 0 # Hand used by lm_list / get_cursor_position / find_distance
+        self.results = None
 
-    def find_hands(self, img, draw=True):
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.hands.process(img_rgb)
+    @property
+    def mp_hands(self):
+        return import_mediapipe().solutions.hands
+
+    @property
+    def hands(self):
+        if self._hands is None:
+            self._hands = self.mp_hands.Hands(
+                static_image_mode=self.mode,
+                max_num_hands=self.max_hands,
+                min_detection_confidence=self.detection_con,
+                min_tracking_confidence=self.track_con
+            )
+        return self._hands
+
+    def close(self):
+        """Releases the MediaPipe graph, if one was built."""
+        if self._hands is not None:
+            self._hands.close()
+            self._hands = None
+
+    def set_quality(self, scale_factor=1.0, infer_every=1):
+        """Quality tier hook: scales the configured inference_scale down and raises infer_every."""
+        base_scale, base_every = self.base_quality
+        self.inference_scale = min(base_scale * scale_factor, 1.0)
+        self.infer_every = max(base_every, infer_every)
+
+    def warm_up(self, frame_shape=(720, 1280, 3)):
+        """
+        Imports mediapipe, builds the graph and runs one inference on a blank frame, so the
+        first real frame does not pay for model loading. Returns {phase: seconds}.
+        Tracking state (roi, last inference) is not touched.
+        """
+        timings = {}
+        start = time.perf_counter()
+        import_mediapipe()
+        timings["import mediapipe"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        self.hands
+        timings["build graph"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        self._process(np.zeros(frame_shape, np.uint8))
+        timings["warm-up inference"] = time.perf_counter() - start
+        return timings
+
+    def detect(self, img):
+        """
+        Returns hand results for a BGR frame with landmarks normalized to the full frame.
+        Depending on infer_every this either runs the model or extrapolates the last landmarks.
+        Only the tracking / scheduling state is updated, never self.results.
+        """
+        now = time.perf_counter()
+        self.frame_times.append(now)
+        
+        with self.profiler.span("motion"):
+            infer = self._should_infer(img)
+        if not infer:
+            self.frames_since_inference += 1
+            return self._extrapolate(now)
+        
+        results = self._infer(img)
+        if results is None:
+            # The model did not run (e.g. a shared service dropped the frame): treat it as skipped
+            self.frames_since_inference += 1
+            if self.last_inference is None:
+                return SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+            return self._extrapolate(now)
+        self.frames_since_inference = 0
+        self.inference_times.append(now)
         
-        if self.results.multi_hand_landmarks:
+        xy = None
+        if results.multi_hand_landmarks:
+            xy = np.array([[(lm.x, lm.y) for lm in hand_lms.landmark]
+                           for hand_lms in results.multi_hand_landmarks], np.float32)
+        self.prev_inference = self.last_inference
+        self.last_inference = (now, results, xy)
+        return results
+
+    def _should_infer(self, img):
+        if self.infer_every <= 1 or self.last_inference is None:
+            return True
+        
+        thumb = cv2.cvtColor(cv2.resize(img, (32, 18), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        moved = self.motion_thumb is None or cv2.absdiff(thumb, self.motion_thumb).mean() > self.motion_threshold
+        if moved or self.frames_since_inference + 1 >= self.infer_every:
+            self.motion_thumb = thumb
+            return True
+        return False
+
+    def _extrapolate(self, now):
+        """Results for a skipped frame: last landmarks moved along their recent velocity."""
+        t1, results, xy1 = self.last_inference
+        if xy1 is None or self.prev_inference is None:
+            return results
+        t0, _, xy0 = self.prev_inference
+        if xy0 is None or xy0.shape != xy1.shape or t1 <= t0:
+            return results
+        
+        dt = min(now - t1, self.max_extrapolation)
+        xy = xy1 + (xy1 - xy0) * (dt / (t1 - t0))
+        
+        hands = []
+        for hand_lms, hand_xy in zip(results.multi_hand_landmarks, xy):
+            hand = type(hand_lms)()
+            hand.CopyFrom(hand_lms)
+            for lm, (x, y) in zip(hand.landmark, hand_xy):
+                lm.x, lm.y = float(x), float(y)
+            hands.append(hand)
+        return SimpleNamespace(multi_hand_landmarks=hands, multi_handedness=results.multi_handedness)
+
+    def inference_rate(self):
+        """Actual model runs per second over the recent window (compare with frame_rate)."""
+        return self._rate(self.inference_times)
+
+    def frame_rate(self):
+        return self._rate(self.frame_times)
+
+    @staticmethod
+    def _rate(times):
+        if len(times) < 2 or times[-1] <= times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def _infer(self, img):
+        if self.roi_tracking and self.roi is not None:
+            results = self._process(img, self.roi)
+            if results is None:
+                return None
+            if results.multi_hand_landmarks:
+                self._update_roi(results, img.shape)
+                return results
+            # Tracking lost, search the whole frame again
+            self.roi = None
+
+        results = self._process(img)
+        if self.roi_tracking and results is not None and results.multi_hand_landmarks:
+            self._update_roi(results, img.shape)
+        return results
+
+    def _process(self, img, roi=None):
+        h, w = img.shape[:2]
+        x0, y0, x1, y1 = roi if roi is not None else (0, 0, w, h)
+        crop = img[y0:y1, x0:x1]
+        
+        # Resize and color conversion write into the scratch buffer; when scaling,
+        # the RGB conversion then runs in place on the resized copy.
+        if self.inference_scale < 1.0:
+            with self.profiler.span("resize"):
+                # The size OpenCV derives from fx / fy, so the scratch view is written as is
+                size = (max(round((x1 - x0) * self.inference_scale), 1),
+                        max(round((y1 - y0) * self.inference_scale), 1))
+                small = self.scratch.view((size[1], size[0], 3))
+                crop = cv2.resize(crop, None, dst=small, fx=self.inference_scale, fy=self.inference_scale,
+                                  interpolation=cv2.INTER_AREA)
+            with self.profiler.span("cvtColor"):
+                img_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB, dst=crop)
+        else:
+            with self.profiler.span("cvtColor"):
+                img_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB, dst=self.scratch.view(crop.shape))
+        with self.profiler.span("hands.process"):
+            results = self._run_model(img_rgb)
+        
+        # Landmarks come back normalized to the crop; scaling does not change them,
+        # cropping does, so map them back to full-frame coordinates.
+        if roi is not None and results is not None and results.multi_hand_landmarks:
+            cw, ch = x1 - x0, y1 - y0
+            for hand_lms in results.multi_hand_landmarks:
+                for lm in hand_lms.landmark:
+                    lm.x = (x0 + lm.x * cw) / w
+                    lm.y = (y0 + lm.y * ch) / h
+        return results
+
+    def _run_model(self, img_rgb):
+        """Runs the hand model on a preprocessed RGB image. Returning None means no result for this frame."""
+        return self.hands.process(img_rgb)
+
+    def _update_roi(self, results, shape):
+        """Square crop around all detected hands, padded by roi_margin and clamped to the frame."""
+        h, w = shape[:2]
+        xs = [lm.x * w for hand_lms in results.multi_hand_landmarks for lm in hand_lms.landmark]
+        ys = [lm.y * h for hand_lms in results.multi_hand_landmarks for lm in hand_lms.landmark]
+        
+        cx, cy = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+        side = max(max(xs) - min(xs), max(ys) - min(ys)) * (1 + 2 * self.roi_margin)
+        side = int(min(max(side, min(w, h) / 3), min(w, h))) # Not so small that a fast hand escapes
+        
+        x0 = int(min(max(cx - side / 2, 0), w - side))
+        y0 = int(min(max(cy - side / 2, 0), h - side))
+        self.roi = (x0, y0, x0 + side, y0 + side)
+
+    def find_hands(self, img, draw=True, results=None):
+        # results can be passed in when detect() already ran elsewhere (e.g. on the inference thread)
+        self.results = self.detect(img) if results is None else results
+        
+        if draw and self.results.multi_hand_landmarks:
             for hand_lms in self.results.multi_hand_landmarks:
-                if draw:
-                    self.mp_draw.draw_landmarks(img, hand_lms, self.mp_hands.HAND_CONNECTIONS)
+                draw_hand_landmarks(img, np.array([(lm.x, lm.y) for lm in hand_lms.landmark], np.float32))
         return img
 
     def find_position(self, img, hand_no=0, draw=True):
-        self.lm_list = []
-        if self.results.multi_hand_landmarks:
-            my_hand = self.results.multi_hand_landmarks[hand_no]
-            h, w, c = img.shape
-            for id, lm in enumerate(my_hand.landmark):
-                cx, cy = int(lm.x * w), int(lm.y * h)
-                self.lm_list.append([id, cx, cy])
-                if draw and id == 8: # Index finger tip
-                    cv2.circle(img, (cx, cy), 15, (255, 0, 255), cv2.FILLED)
+        self.hand_no = hand_no
+        self.num_hands = self._load_landmarks(self.results)
+        if self.num_hands:
+            h, w = img.shape[:2]
+            n = self.num_hands
+            # int() semantics (truncation), like the old per-landmark conversion
+            np.multiply(self.landmarks[:n, :, :2], (w, h), out=self.landmarks_px[:n], casting="unsafe")
+            
+            if draw and hand_no < n: # Index finger tip
+                cv2.circle(img, self.lm_px(hand_no)[8], 15, (255, 0, 255), cv2.FILLED)
         return self.lm_list
 
-    def get_cursor_position(self):
+    def _load_landmarks(self, results):
+        """Copies the normalized landmarks of results into self.landmarks. Returns the number of hands."""
+        hands = results.multi_hand_landmarks if results else None
+        if not hands:
+            return 0
+        hands = hands[:self.max_hands]
+        for k, hand_lms in enumerate(hands):
+            self.landmarks[k].flat = np.fromiter(
+                (v for lm in hand_lms.landmark for v in (lm.x, lm.y, lm.z)), np.float32, NUM_LANDMARKS * 3)
+        return len(hands)
+
+    @property
+    def lm_list(self):
+        """[id, x, y] per landmark of the selected hand (empty when it is not detected)."""
+        size = NUM_LANDMARKS if self.hand_no < self.num_hands else 0
+        return LandmarkList(self.landmarks_px[self.hand_no], size)
+
+    def lm_px(self, hand_no=None):
+        """(x, y) pixel tuples of one hand's landmarks."""
+        px = self.landmarks_px[self.hand_no if hand_no is None else hand_no]
+        return [(int(x), int(y)) for x, y in px]
+
+    def hands_px(self):
+        """(num_hands, 21, 2) pixel coordinates of all detected hands (a view, do not keep it across frames)."""
+        return self.landmarks_px[:self.num_hands]
+
+    def get_cursor_position(self, hand_no=None):
         """Returns the coordinates of the index finger tip (Landmark 8) if available."""
-        if self.lm_list and len(self.lm_list) > 8:
-            return self.lm_list[8][1], self.lm_list[8][2]
+        hand_no = self.hand_no if hand_no is None else hand_no
+        if hand_no < self.num_hands:
+            x, y = self.landmarks_px[hand_no, 8]
+            return int(x), int(y)
         return None
 
+    def fingertip_distances(self):
+        """
+        Pairwise pixel distances between the five fingertips (tip_ids order) of every hand
+        in one call, as a (num_hands, 5, 5) array.
+        """
+        return self.landmark_distances(self.tip_ids)
+
+    def landmark_distances(self, ids):
+        """Pairwise pixel distances between the given landmarks, (num_hands, len(ids), len(ids))."""
+        pts = self.landmarks_px[:self.num_hands, ids].astype(np.float32)
+        diff = pts[:, :, None, :] - pts[:, None, :, :]
+        return np.sqrt((diff * diff).sum(axis=-1))
+
     def find_distance(self, p1, p2, img=None):
         """Finds distance between two landmarks (indices) or points (tuples)."""
         if isinstance(p1, int) and isinstance(p2, int):
             # Using landmark indices
-            if len(self.lm_list) < max(p1, p2): return 0, img, None
-            x1, y1 = self.lm_list[p1][1], self.lm_list[p1][2]
-            x2, y2 = self.lm_list[p2][1], self.lm_list[p2][2]
+            if self.hand_no >= self.num_hands or max(p1, p2) >= NUM_LANDMARKS: return 0, img, None
+            px = self.landmarks_px[self.hand_no]
+            x1, y1 = int(px[p1, 0]), int(px[p1, 1])
+            x2, y2 = int(px[p2, 0]), int(px[p2, 1])
         else:
             # Using coordinates directly
             x1, y1 = p1
@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import deque
+from itertools import count
+import numpy as np
+from hand_tracking import HandDetector
+
+class _Request:
+    __slots__ = ("image", "submitted", "done", "results")
+
+    def __init__(self, image):
+        self.image = image
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.results = None
+
+class InferenceService:
+    """
+    Pool of hand-model workers shared by every session, instead of one MediaPipe graph per viewer.
+
+    Each session has a single request slot: a new frame replaces one that is still waiting, so a
+    session never queues more than its newest frame. Waiting sessions are served round-robin, and
+    a request older than max_age when a worker gets to it is dropped rather than processed late.
+    The session then extrapolates its last landmarks (see HandDetector.detect).
+
+    Workers take up to batch_size waiting requests per wakeup. MediaPipe Hands has no batched
+    input, so a batch is run one image after another; it only saves lock round trips.
+
+    The graphs run in static-image mode by default: a worker serves many sessions in turn, and
+    video-mode tracking would carry one session's hand into the next session's frame.
+    Sessions get cheap steady-state tracking from their own roi_tracking instead.
+
+        service = InferenceService(workers=2).start()
+        app = KiteApp(use_camera=False, detector=SharedHandDetector(service, roi_tracking=True))
+    """
+    def __init__(self, workers=2, max_age=0.2, batch_size=4, **detector_options):
+        detector_options.setdefault("mode", True)
+        self.detector_options = detector_options
+        self.num_workers = workers
+        self.max_age = max_age # seconds a request may wait before it is dropped
+        self.batch_size = batch_size
+        self.cond = threading.Condition()
+        self.pending = {} # session id -> newest request not yet taken by a worker
+        self.ready = deque() # session ids with a pending request, in service order
+        self.sessions = {} # session id -> counters
+        self.session_ids = count()
+        self.busy = [0.0] * workers # seconds each worker spent in the model
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        self.running = True
+        self.threads = [threading.Thread(target=self._worker_loop, args=(i,), name=f"inference-{i}", daemon=True)
+                        for i in range(self.num_workers)]
+        for t in self.threads:
+            t.start()
+        return self
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            for req in self.pending.values():
+                req.done.set()
+            self.pending.clear()
+            self.ready.clear()
+            self.cond.notify_all()
+        for t in self.threads:
+            t.join(timeout=1.0)
+
+    def register(self):
+        """Adds a session and returns its id."""
+        with self.cond:
+            session_id = next(self.session_ids)
+            self.sessions[session_id] = {"submitted": 0, "processed": 0, "replaced": 0, "stale": 0}
+            return session_id
+
+    def unregister(self, session_id):
+        with self.cond:
+            self.sessions.pop(session_id, None)
+            req = self.pending.pop(session_id, None)
+            if req is not None:
+                self.ready.remove(session_id)
+                req.done.set()
+
+    def infer(self, session_id, img_rgb, timeout=0.5):
+        """
+        Runs the hand model on an RGB image for a session and waits for the results.
+        Returns None if the frame was dropped, replaced by a newer one, or timed out.
+        """
+        req = _Request(img_rgb)
+        with self.cond:
+            stats = self.sessions[session_id]
+            old = self.pending.get(session_id)
+            if old is not None:
+                stats["replaced"] += 1
+                old.done.set()
+            else:
+                self.ready.append(session_id)
+            self.pending[session_id] = req
+            stats["submitted"] += 1
+            self.cond.notify()
+        req.done.wait(timeout)
+        return req.results
+
+    def stats(self):
+        with self.cond:
+            sessions = {sid: dict(s) for sid, s in self.sessions.items()}
+            waiting = len(self.ready)
+        totals = {key: sum(s[key] for s in sessions.values())
+                  for key in ("submitted", "processed", "replaced", "stale")}
+        return {"sessions": len(sessions), "waiting": waiting, "worker_busy_s": list(self.busy),
+                **totals, "per_session": sessions}
+
+    def _take_batch(self):
+        # Fair share of the waiting sessions, so one worker does not grab work another could start on
+        share = -(-len(self.ready) // self.num_workers)
+        batch = []
+        while self.ready and len(batch) < min(share, self.batch_size):
+            session_id = self.ready.popleft()
+            batch.append((session_id, self.pending.pop(session_id)))
+        return batch
+
+    def _worker_loop(self, index):
+        hands = HandDetector(**self.detector_options).hands # One graph per worker, built on its thread
+        hands.process(np.zeros((360, 640, 3), np.uint8)) # Warm-up, so the first session frame is not slow
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.ready or not self.running)
+                if not self.running: break
+                batch = self._take_batch()
+
+            done = []
+            for session_id, req in batch:
+                start = time.perf_counter()
+                if start - req.submitted > self.max_age:
+                    done.append((session_id, "stale"))
+                else:
+                    req.results = hands.process(req.image)
+                    self.busy[index] += time.perf_counter() - start
+                    done.append((session_id, "processed"))
+                req.done.set()
+
+            with self.cond:
+                for session_id, outcome in done:
+                    if session_id in self.sessions:
+                        self.sessions[session_id][outcome] += 1
+        hands.close()
+
+class SharedHandDetector(HandDetector):
+    """
+    HandDetector that runs the model through an InferenceService instead of its own graph.
+    Cropping, scaling, frame skipping and landmark state all stay local to the session.
+    """
+    def __init__(self, service, timeout=0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.service = service
+        self.timeout = timeout
+        self.session_id = service.register()
+
+    def warm_up(self, frame_shape=(720, 1280, 3)):
+        """Nothing to load per session: the service workers build and warm up their own graphs."""
+        return {}
+
+    def _run_model(self, img_rgb):
+        # img_rgb lives in the scratch buffer, which the next frame overwrites even if
+        # this request timed out and is still queued, so the service gets its own copy
+        return self.service.infer(self.session_id, img_rgb.copy(), self.timeout)
+
+    def close(self):
+        self.service.unregister(self.session_id)
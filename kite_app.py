@@ -1,25 +1,62 @@
+import copy
+import threading
+import time
 import cv2
 import numpy as np
 from hand_tracking import HandDetector
 from ui_components import Button, DraggableObject
 from utils import draw_transparent_rect
+from render_cache import UILayer, SceneLayer, TextCache
+from pipeline import FramePipeline
+from profiler import Profiler
+from hand_state import HandStates
+from scene import SceneModel
+from kite_wall import KiteWall
+from kite_flight import KiteFlight
+from media_writer import ScreenshotWriter, SessionRecorder
+from quality import QualityGovernor
+from landmark_trace import TraceRecorder
+
+# Cursor ring color per hand slot
+HAND_COLORS = [(255, 255, 255), (255, 200, 0), (0, 200, 255), (200, 0, 255)]
 
 class KiteApp:
-    def __init__(self, use_camera=True):
+    def __init__(self, use_camera=True, pipelined=False, detector=None, profile=False, cursor_filter="one_euro",
+                 warm_up=True, target_fps=30.0, adaptive_quality=True, max_hands=2, wall_kites=400,
+                 sky_kites=24, record_trace=None):
+        self.startup_start = time.perf_counter()
+        self.startup_times = {} # phase -> seconds, see report_startup
+        self.first_frame_done = False
+        # pipelined: capture, inference and rendering run on separate threads (see run)
+        self.pipelined = pipelined
+        # profile: per-stage timing + on-frame HUD (toggle with 'h' at runtime)
+        self.profiler = Profiler(enabled=profile)
+        self.show_hud = profile
+        # Opening the camera can take a second or more; do it while the model loads
+        self.cap = None
+        camera_thread = None
         if use_camera:
-            self.cap = cv2.VideoCapture(0)
-            self.cap.set(3, 1280)
-            self.cap.set(4, 720)
-        else:
-            self.cap = None
+            camera_thread = threading.Thread(target=self.open_camera, name="camera-open", daemon=True)
+            camera_thread.start()
         
-        self.detector = HandDetector(max_hands=1)
-        self.prev_hand_pos = None # For smoothing
-        self.is_pinch_active = False # State for hysteresis
+        # Landmarks come back normalized, so a half-resolution copy is plenty for MediaPipe.
+        # A detector can be injected instead (e.g. the scripted one used by the benchmarks).
+        self.detector = detector or HandDetector(max_hands=max_hands, inference_scale=0.5)
+        self.detector.profiler = self.profiler
+        if warm_up:
+            # Model import, graph build and one dummy inference now rather than on the first frame
+            self.startup_times.update(self.detector.warm_up())
+        # Per-hand cursor, pinch and held object, one slot per hand the detector can report.
+        # Smoothing: cursor_filter is "one_euro", "kalman" or "exponential" (the old alpha = 0.5).
+        # The cursor is also predicted forward by the measured capture-to-display latency.
+        self.hands = HandStates(self.detector.max_hands, cursor_filter)
+        self.latency = 0.0 # seconds, smoothed
+        self.infer_time = 0.0 # seconds spent in infer_frame for the latest frame
+        self.clock = time.perf_counter # Filter timestamps; headless runs swap in a simulated clock
+        # Drops effects / inference resolution in steps when frames take longer than 1 / target_fps
+        self.quality = QualityGovernor(target_fps, enabled=adaptive_quality)
         
         # State
-        self.objects = [] # List of placed objects
-        self.current_object = None # Object currently being dragged
         self.kite_color = (0, 200, 255) # Start yellow
         
         # UI Setup
@@ -27,6 +64,8 @@ class KiteApp:
             Button("Stick 1", (20, 100), action_id="stick1"),
             Button("Stick 2", (20, 180), action_id="stick2"),
             Button("Paper", (20, 260), action_id="paper"),
+            Button("Fly!", (20, 340), color=(0, 100, 0), action_id="flight"),
+            Button("Record", (20, 450), color=(0, 0, 100), action_id="record"),
             Button("Screenshot", (20, 530), color=(100, 100, 100), action_id="screenshot"),
             Button("Reset", (20, 600), color=(0, 0, 150), action_id="reset"),
             Button("Exit", (20, 670), color=(0, 0, 0), action_id="exit")
@@ -40,59 +79,155 @@ class KiteApp:
              Button("", (1150, 340), size=(50, 50), color=(255, 0, 255), action_id="col_purple"),
         ]
         
+        # Placed objects + buttons behind a spatial index, shared by mouse and pinch input
+        self.scene = SceneModel(self.buttons + self.color_buttons)
+        
         self.message = "Welcome! Select a component."
         self.msg_timer = 0
+        self.running = False
+        self.screenshot_pending = False
+        # Screenshots and recordings are encoded on background threads, never in the render loop
+        self.screenshots = ScreenshotWriter()
+        self.recorder = None
+        self.finishing = [] # Stopped recorders still encoding their queued frames
+        # record_trace: file the hand landmarks of every frame are recorded to (see landmark_trace.py).
+        # The recorder is opened on the first frame, whose size goes into the trace header.
+        self.trace_path = record_trace
+        self.trace = None
+        
+        # Sidebar, buttons and text only change on hover updates, so cache them
+        self.ui_layer = UILayer(self.draw_ui)
+        # Rendered strings; the message is blended from here every frame instead of being part of the layer
+        self.text_cache = TextCache()
+        # Placed objects never move: they live in a layer that is only repainted on place / recolor / reset
+        self.scene_layer = SceneLayer(DraggableObject.sprites)
+        # Kite wall display mode ('w'): wall_kites copies of the built kite, drawn in batches
+        self.wall_kites = wall_kites
+        self.wall = None
+        # Flight mode ('f'): the built kite flies on a simulated manjha from each hand, among sky_kites others
+        self.sky_kites = sky_kites
+        self.flight = None
+        self.apply_quality()
+        if warm_up:
+            start = time.perf_counter()
+            self.ui_layer.rebuild((720, 1280, 3)) # The camera is asked for 1280x720 above
+            self.ui_layer.key = self.ui_key()
+            self.startup_times["ui layer"] = time.perf_counter() - start
         
         if use_camera:
             cv2.namedWindow("Gravity AR Kite")
             cv2.setMouseCallback("Gravity AR Kite", self.mouse_callback)
+            camera_thread.join()
+        self.startup_times["init"] = time.perf_counter() - self.startup_start
+
+    def apply_quality(self):
+        """Pushes the current quality tier to the detector and the cached layers."""
+        tier = self.quality.tier
+        self.detector.set_quality(tier.inference_scale, tier.infer_every)
+        self.scene_layer.set_detail(tier.sprite_detail) # The UI layer picks it up through ui_key
+
+    def open_camera(self):
+        start = time.perf_counter()
+        cap = cv2.VideoCapture(0)
+        cap.set(3, 1280)
+        cap.set(4, 720)
+        self.cap = cap
+        self.startup_times["camera open (parallel)"] = time.perf_counter() - start
+
+    def report_startup(self):
+        """Records the time to the first rendered frame and prints all startup phases."""
+        self.first_frame_done = True
+        self.startup_times["first frame"] = time.perf_counter() - self.startup_start
+        print("Startup:")
+        for phase, seconds in self.startup_times.items():
+            print(f"  {phase:<24}{seconds * 1000:8.1f} ms")
 
     def mouse_callback(self, event, x, y, flags, param):
         if event == cv2.EVENT_LBUTTONDOWN:
             # Check UI Buttons
-            for btn in self.buttons + self.color_buttons:
-                if btn.is_hover(x, y):
-                    self.handle_button_click(btn.action_id, btn.color)
-                    return
+            btn = self.scene.hit_test((x, y))
+            if btn:
+                self.handle_button_click(btn.action_id, btn.color)
+                return
 
             # Place object if dragging
             if self.current_object:
                 if self.current_object.type == 'color_blob':
-                    # Check collision with "paper" object
-                    for obj in self.objects:
-                        if obj.type == 'paper':
-                             # Basic distance check for simplicity
-                             dist = np.linalg.norm(np.array(self.current_object.pos) - np.array(obj.pos))
-                             if dist < 100: # If near paper
-                                 obj.color = self.current_object.color
-                                 self.message = "Colored!"
-                                 self.current_object = None
-                                 return
-                    self.message = "Missed the kite!"
-                    self.current_object = None # Discard blob if missed
+                    # Check collision with "paper" object, discard blob if missed
+                    self.message = "Colored!" if self.drop_color(100) else "Missed the kite!"
                 else:
-                    self.current_object.place()
-                    self.objects.append(self.current_object)
-                    self.current_object = None
+                    self.place_current()
                     self.message = "Placed!"
 
 
+    @property
+    def objects(self):
+        """Placed objects, in stacking order."""
+        return self.scene.objects
+
+    @property
+    def current_object(self):
+        """Object dragged by the primary hand, which mouse clicks and buttons act on."""
+        return self.hands.held[self.hands.primary()]
+
+    @current_object.setter
+    def current_object(self, obj):
+        self.hands.held[self.hands.primary()] = obj
+
+    def place_current(self, slot=None):
+        """Locks the object dragged by a hand (default: the primary one) in place and adds it to the scene."""
+        slot = self.hands.primary() if slot is None else slot
+        obj = self.hands.held[slot]
+        obj.place()
+        self.scene.add(obj)
+        self.scene_layer.add(obj)
+        self.hands.held[slot] = None
+
+    def drop_color(self, radius, slot=None):
+        """Drops a hand's color blob onto the nearest paper within radius. Returns whether it hit."""
+        slot = self.hands.primary() if slot is None else slot
+        blob = self.hands.held[slot]
+        paper = self.scene.nearest('paper', blob.pos, radius)
+        if paper:
+            self.recolor(paper, blob.color)
+        self.hands.held[slot] = None
+        return paper is not None
+
+    def check_order(self, action_id):
+        """Why a component can't be taken yet (kite build order), or None."""
+        if action_id == "stick2" and not self.scene.has('stick1'):
+            return "Need Stick 1 first!"
+        if action_id == "paper" and not (self.scene.has('stick1') and self.scene.has('stick2')):
+            return "Need both sticks first!"
+        return None
+
+    def recolor(self, obj, color):
+        obj.color = color
+        self.scene_layer.repaint(obj, self.objects)
+
     def handle_button_click(self, action_id, color):
         if action_id == "exit":
             self.running = False
             
         elif action_id == "screenshot":
-            import time
             filename = f"kite_screenshot_{int(time.time())}.png"
             # We need to capture the frame *with* the overlay. 
             # This is tricky because `self.handle_button_click` happens inside the loop but we don't have the final frame here.
             # We will set a flag.
             self.screenshot_pending = True
+            self.scene_layer.invalidate() # Capture a freshly painted scene
             self.message = "Cheese! 📸"
 
+        elif action_id == "record":
+            self.toggle_recording()
+
+        elif action_id == "flight":
+            self.toggle_flight()
+
         elif action_id == "reset":
-            self.objects = []
-            self.current_object = None
+            self.scene.clear()
+            self.hands.held[:] = None
+            self.scene_layer.invalidate()
             self.message = "Reset complete."
             
         elif action_id.startswith("col_"):
@@ -111,14 +246,9 @@ class KiteApp:
                 return
                 
             # Logic check
-            has_stick1 = any(o.type == 'stick1' for o in self.objects)
-            has_stick2 = any(o.type == 'stick2' for o in self.objects)
-            
-            if action_id == "stick2" and not has_stick1:
-                self.message = "Need Stick 1 first!"
-                return
-            if action_id == "paper" and not (has_stick1 and has_stick2):
-                self.message = "Need both sticks first!"
+            problem = self.check_order(action_id)
+            if problem:
+                self.message = problem
                 return
                 
             self.current_object = DraggableObject(len(self.objects), action_id)
@@ -126,111 +256,64 @@ class KiteApp:
                 self.current_object.color = self.kite_color
             self.message = f"Placing {action_id}..."
 
-    def process_frame(self, img):
-        img = cv2.flip(img, 1)
-        img = self.detector.find_hands(img)
-        self.detector.find_position(img, draw=False) # Update landmarks list
-        raw_hand_pos = self.detector.get_cursor_position()
-        
-        # Smoothing
-        hand_pos = None
-        if raw_hand_pos:
-            if self.prev_hand_pos is None:
-                self.prev_hand_pos = raw_hand_pos
-            else:
-                # Alpha smoothing: new = alpha * raw + (1-alpha) * prev
-                # alpha 0.5 is balanced. 0.2 is very smooth but laggy. 0.8 is responsive but jittery.
-                alpha = 0.5 
-                px, py = self.prev_hand_pos
-                rx, ry = raw_hand_pos
-                nx = int(alpha * rx + (1 - alpha) * px)
-                ny = int(alpha * ry + (1 - alpha) * py)
-                self.prev_hand_pos = (nx, ny)
-            
-            hand_pos = self.prev_hand_pos
-            
-            # Pinch Detection (Thumb 4 and Index 8)
-            length, _, _ = self.detector.find_distance(4, 8)
-            
-            # Hysteresis Logic to prevent glitching
-            # Harder to trigger (30), harder to lose (50)
-            if not self.is_pinch_active and length < 30:
-                self.is_pinch_active = True
-            elif self.is_pinch_active and length > 50:
-                self.is_pinch_active = False
-                
-            is_pinching = self.is_pinch_active
-            
-            # Visual feedback for pinch
-            if is_pinching:
-                cv2.circle(img, hand_pos, 10, (0, 0, 255), -1) # Red cursor when pinching
-                # Draw line between fingers to show connection
-                x1, y1 = self.detector.lm_list[4][1], self.detector.lm_list[4][2]
-                x2, y2 = self.detector.lm_list[8][1], self.detector.lm_list[8][2]
-                cv2.line(img, (x1, y1), (x2, y2), (0, 0, 255), 2)
-            else:
-                cv2.circle(img, hand_pos, 10, (0, 255, 0), -1) # Green cursor otherwise
-            cv2.circle(img, hand_pos, 15, (255, 255, 255), 2)
-            
-            # Handle Grabbing via Pinch
-            if is_pinching:
-                if not self.current_object:
-                    # 1. Check Color Palette
-                    for btn in self.color_buttons:
-                        if btn.is_hover(hand_pos[0], hand_pos[1]):
-                            self.current_object = DraggableObject(len(self.objects), "color_blob")
-                            self.current_object.color = btn.color
-                            self.message = "Pinch & Drag Color!"
-                            return img # Return early to smooth interaction
-
-                    # 2. Check Sidebar Tools (Sticks, Paper)
-                    for btn in self.buttons:
-                        if btn.action_id in ["stick1", "stick2", "paper"] and btn.is_hover(hand_pos[0], hand_pos[1]):
-                            # Order Logic Check
-                            has_stick1 = any(o.type == 'stick1' for o in self.objects)
-                            has_stick2 = any(o.type == 'stick2' for o in self.objects)
-                            
-                            if btn.action_id == "stick2" and not has_stick1:
-                                self.message = "Need Stick 1 first!"
-                                return img
-                            if btn.action_id == "paper" and not (has_stick1 and has_stick2):
-                                self.message = "Need both sticks first!"
-                                return img
-
-                            self.current_object = DraggableObject(len(self.objects), btn.action_id)
-                            if btn.action_id == 'paper':
-                                self.current_object.color = self.kite_color
-                            self.message = f"Grabbed {btn.text}!"
-                            
-            else:
-                # Released Pinch (Drop/Place)
-                if self.current_object:
-                    if self.current_object.type == 'color_blob':
-                        # Drop Color
-                        dropped = False
-                        for obj in self.objects:
-                            if obj.type == 'paper':
-                                 dist = np.linalg.norm(np.array(self.current_object.pos) - np.array(obj.pos))
-                                 if dist < 120: 
-                                     obj.color = self.current_object.color
-                                     self.message = "Colored with Style!"
-                                     dropped = True
-                                     break
-                        
-                        if not dropped: self.message = "Released Color"
-                        self.current_object = None 
-
-                    else:
-                        # Place Stick/Paper
-                        self.current_object.place()
-                        self.objects.append(self.current_object)
-                        self.current_object = None
-                        self.message = "Placed!"
+    def toggle_wall(self):
+        """Switches the kite wall display mode on (laid out from the current kite) or off."""
+        if self.wall is None:
+            self.set_flight(False)
+            self.wall = KiteWall(self.wall_kites)
+            self.message = f"Kite wall: {self.wall_kites} kites!"
+        else:
+            self.wall = None
+            self.message = "Back to building."
+
+    def toggle_flight(self):
+        """Switches flight mode on (flying the current kite) or off."""
+        if self.flight is None:
+            self.wall = None
+            self.set_flight(True)
+            self.message = "Fly! Your hand holds the manjha."
+        else:
+            self.set_flight(False)
+            self.message = "Back to building."
+
+    def set_flight(self, on):
+        flight_btn = next(btn for btn in self.buttons if btn.action_id == "flight")
+        self.flight = KiteFlight(self.detector.max_hands, self.sky_kites) if on else None
+        flight_btn.text = "Land" if on else "Fly!"
 
+    def toggle_recording(self, fps=30.0):
+        record_btn = next(btn for btn in self.buttons if btn.action_id == "record")
+        if self.recorder is None:
+            self.recorder = SessionRecorder(f"recordings/kite_{int(time.time())}.mp4", fps)
+            record_btn.text = "Stop Rec"
+            self.message = "Recording..."
         else:
-            self.prev_hand_pos = None # Reset if hand lost
+            # The encoder finishes the queued frames and closes the file on its own thread
+            self.recorder.close(wait=False)
+            self.finishing = [r for r in self.finishing if r.thread.is_alive()] + [self.recorder]
+            stats = self.recorder.stats()
+            self.message = f"Saved {self.recorder.path} ({stats['dropped']} frames dropped)"
+            self.recorder = None
+            record_btn.text = "Record"
+
+    def close(self):
+        """Stops a running recording and waits for pending screenshots / video frames to be written."""
+        if self.recorder is not None:
+            self.finishing.append(self.recorder)
+            self.recorder = None
+        for recorder in self.finishing:
+            recorder.close()
+        self.finishing = []
+        self.screenshots.close()
+        if self.trace is not None:
+            self.trace.close()
 
-        # Draw UI
+    def ui_key(self):
+        """Everything the cached UI layer depends on."""
+        return (tuple(btn.hover for btn in self.buttons + self.color_buttons),
+                self.recorder is not None, self.flight is not None, self.quality.tier.text_outline)
+
+    def draw_ui(self, img):
         draw_transparent_rect(img, (0, 0), (250, 720), (30, 30, 30), 0.6) # Sidebar bg
         
         # Festive Text with Glow (Moved to Bottom)
@@ -238,58 +321,302 @@ class KiteApp:
         font = cv2.FONT_HERSHEY_TRIPLEX
         scale = 1.0
         pos = (350, 680)
-        # Shadow/Glow
-        cv2.putText(img, text, (pos[0]+2, pos[1]+2), font, scale, (0, 0, 0), 4) # Black outline
-        cv2.putText(img, text, pos, font, scale, (0, 255, 255), 2) # Yellow text
+        # Yellow text with a black shadow/glow
+        outline = ((0, 0, 0), 4, (2, 2)) if self.quality.tier.text_outline else None
+        self.text_cache.put(img, text, pos, font, scale, (0, 255, 255), 2, outline)
         
-        cv2.putText(img, "From Somyajeet", (pos[0]+200, pos[1]+30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (240, 240, 240), 1)
+        self.text_cache.put(img, "From Somyajeet", (pos[0]+200, pos[1]+30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (240, 240, 240), 1)
         
         for btn in self.buttons:
             btn.draw(img)
             
         for btn in self.color_buttons:
              btn.draw(img)
+
+    def infer_frame(self, img):
+        """
+        Mirror + hand inference. Thread-safe w.r.t. render_frame, used by the pipelined mode.
+        The caller's frame is mirrored in place, so no frame-sized buffer is allocated;
+        pass a copy if the original is still needed.
+        """
+        captured_at = time.perf_counter()
+        with self.profiler.span("flip"):
+            img = cv2.flip(img, 1, dst=img)
+        with self.profiler.span("detect"):
+            results = self.detector.detect(img)
+        self.infer_time = time.perf_counter() - captured_at
+        return img, results, captured_at
+
+    def process_frame(self, img):
+        """
+        Runs one frame through inference and rendering. The caller's frame is modified:
+        it is mirrored and the scene and UI are drawn onto it; the returned image shares its buffer.
+        """
+        return self.render_frame(*self.infer_frame(img))
+
+    def render_frame(self, img, results, captured_at=None):
+        render_start = time.perf_counter()
+        with self.profiler.span("landmarks"):
+            img = self.detector.find_hands(img, draw=self.quality.tier.draw_landmarks, results=results)
+            self.detector.find_position(img, draw=False) # Update landmarks list
         
-        # Update & Draw Objects
-        for obj in self.objects:
-            obj.draw(img)
-            
-        if self.current_object:
-            self.current_object.update(hand_pos)
-            self.current_object.draw(img)
-            
-        # Message
-        cv2.putText(img, self.message, (300, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+        now = self.clock()
+        if self.trace_path is not None:
+            if self.trace is None:
+                self.trace = TraceRecorder(self.trace_path, self.detector.max_hands, img.shape[1::-1])
+            self.trace.record(now, self.detector, self.latency)
+        with self.profiler.span("gesture"):
+            self.update_hands(img, now)
+
+        with self.profiler.span("ui"):
+            # Draw UI (cached layer, rebuilt only when hover states change)
+            self.ui_layer.composite(img, self.ui_key())
         
-        # Handle Screenshot
+        if self.flight is not None:
+            with self.profiler.span("physics"):
+                self.flight.fly(now, img.shape, self.hands.cursor, self.hands.active, self.objects)
+
+        with self.profiler.span("objects"):
+            # Placed objects come from the cached scene layer, only the dragged ones are drawn live
+            if self.wall is not None:
+                self.wall.draw(img, now, self.objects, self.quality.tier.sprite_detail)
+            elif self.flight is not None:
+                self.flight.draw(img, self.quality.tier.sprite_detail)
+            else:
+                self.scene_layer.composite(img, self.objects)
+                
+            for obj in self.hands.held:
+                if obj is not None:
+                    obj.draw(img, self.quality.tier.sprite_detail)
+
+        with self.profiler.span("message"):
+            # Drawn last, over placed and dragged objects; rasterized once per change, blended from the text cache
+            self.text_cache.put(img, self.message, (300, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+            
+        # Handle Screenshot / recording: only a frame copy here, encoding happens in the background
         if self.screenshot_pending:
-            import os
-            if not os.path.exists("screenshots"):
-                os.makedirs("screenshots")
-            filename = f"screenshots/kite_{int(cv2.getTickCount())}.jpg"
-            cv2.imwrite(filename, img)
-            self.screenshot_pending = False
-            self.message = f"Saved to {filename}!"
+            with self.profiler.span("screenshot"):
+                filename = self.screenshots.save(img)
+                self.screenshot_pending = False
+                self.message = f"Saved to {filename}!" if filename else "Still saving, try again!"
+        if self.recorder is not None:
+            with self.profiler.span("record"):
+                self.recorder.add(img)
+        
+        if self.show_hud:
+            self.draw_hud(img)
+        self.profiler.tick()
+        
+        if captured_at is not None:
+            # Capture-to-display latency, used to predict the cursor forward
+            now = time.perf_counter()
+            self.latency += 0.1 * ((now - captured_at) - self.latency)
             
+            # Work per frame for the quality governor: the stages overlap when pipelined
+            render_time = now - render_start
+            frame_time = max(self.infer_time, render_time) if self.pipelined else self.infer_time + render_time
+            if self.quality.update(frame_time):
+                self.apply_quality()
         return img
 
+    def draw_hud(self, img):
+        extra = [("Inference", f"{self.detector.inference_rate():5.1f} Hz"), ("Quality", self.quality.tier.name)]
+        if self.recorder is not None:
+            extra.append(("Rec dropped", self.recorder.dropped))
+        self.profiler.draw_hud(img, extra, stages=self.quality.tier.hud_stages)
+
+    def handle_key(self, key):
+        """
+        Keyboard shortcuts: ESC quits, 'h' toggles the performance HUD, 't' saves a Chrome trace,
+        'w' toggles the kite wall, 'f' flight mode.
+        """
+        if key == 27:
+            self.running = False
+        elif key == ord('h'):
+            self.show_hud = not self.show_hud
+            self.profiler.enabled = self.show_hud
+        elif key == ord('t') and self.profiler.enabled:
+            filename = f"kite_trace_{int(time.time())}.json"
+            self.profiler.export_chrome_trace(filename)
+            self.message = f"Trace saved to {filename}"
+        elif key == ord('w'):
+            self.toggle_wall()
+        elif key == ord('f'):
+            self.toggle_flight()
+
+    def update_hands(self, img, now=None):
+        """
+        Smoothing, pinch detection and grab / drop logic for every tracked hand.
+        Filters and pinch hysteresis run for all hands at once in HandStates, only the
+        grab / drop decisions and the cursor drawing are per hand.
+        """
+        hands = self.hands
+        now = self.clock() if now is None else now
+        for slot in hands.update(self.detector.hands_px(), now, self.latency):
+            self.release_lost(slot)
+
+        for slot in np.flatnonzero(hands.active):
+            hand_pos = (int(hands.cursor[slot, 0]), int(hands.cursor[slot, 1]))
+            is_pinching = hands.pinching[slot]
+
+            # Visual feedback for pinch, the ring color tells the hands apart
+            if is_pinching:
+                cv2.circle(img, hand_pos, 10, (0, 0, 255), -1) # Red cursor when pinching
+                # Draw line between fingers to show connection
+                x1, y1 = hands.landmarks[slot, 4].astype(int)
+                x2, y2 = hands.landmarks[slot, 8].astype(int)
+                cv2.line(img, (int(x1), int(y1)), (int(x2), int(y2)), (0, 0, 255), 2)
+            else:
+                cv2.circle(img, hand_pos, 10, (0, 255, 0), -1) # Green cursor otherwise
+            cv2.circle(img, hand_pos, 15, HAND_COLORS[slot % len(HAND_COLORS)], 2)
+
+            held = hands.held[slot]
+            if is_pinching and held is None:
+                self.grab(slot, hand_pos)
+            elif not is_pinching and held is not None:
+                # Released Pinch (Drop/Place)
+                if held.type == 'color_blob':
+                    self.message = "Colored with Style!" if self.drop_color(120, slot) else "Released Color"
+                else:
+                    self.place_current(slot)
+                    self.message = "Placed!"
+
+            if hands.held[slot] is not None:
+                hands.held[slot].update(hand_pos)
+
+    def replay_gestures(self, frames, shape):
+        """
+        Runs the next frames of a TraceReplayDetector through the gesture logic only, with the
+        latency each one was recorded with, so a replay can start mid-trace with the placed and
+        held objects and filter state it would have had. shape is the frame size of the replay.
+        """
+        scratch = np.zeros(shape, np.uint8) # update_hands draws the cursors, onto a throwaway frame
+        for _ in range(frames):
+            self.detector.find_hands(scratch, draw=False)
+            self.detector.find_position(scratch, draw=False)
+            self.latency = float(self.detector.record["latency"])
+            self.update_hands(scratch)
+
+    def gesture_state(self):
+        """
+        Snapshot of everything the gesture logic changes (placed objects, hand slots with their
+        filters and held items, hovered button, message, latency), detached from the app and
+        picklable, so another app can continue from it with restore_gesture_state.
+        """
+        hovered = self.scene.hovered
+        return copy.deepcopy({
+            "objects": self.objects,
+            "hands": self.hands,
+            "hovered": None if hovered is None else self.scene.buttons.index(hovered),
+            "message": self.message,
+            "latency": self.latency,
+        })
+
+    def restore_gesture_state(self, state):
+        """Continues from a gesture_state() snapshot, taken from this app or another one."""
+        state = copy.deepcopy(state)
+        self.scene.clear()
+        for obj in state["objects"]:
+            self.scene.add(obj)
+        self.scene_layer.invalidate()
+        self.hands = state["hands"]
+        for btn in self.scene.buttons:
+            btn.hover = False
+        self.scene.hovered = None if state["hovered"] is None else self.scene.buttons[state["hovered"]]
+        if self.scene.hovered is not None:
+            self.scene.hovered.hover = True
+        self.message = state["message"]
+        self.latency = state["latency"]
+
+    def grab(self, slot, hand_pos):
+        """Pinch on a palette color or a sidebar tool: the hand in slot picks up a new object."""
+        btn = self.scene.hit_test(hand_pos)
+        if btn and btn.action_id.startswith("col_"):
+            # 1. Color Palette
+            obj = DraggableObject(len(self.objects), "color_blob")
+            obj.color = btn.color
+            self.message = "Pinch & Drag Color!"
+
+        elif btn and btn.action_id in ["stick1", "stick2", "paper"]:
+            # 2. Sidebar Tools (Sticks, Paper), with the order logic check
+            problem = self.check_order(btn.action_id)
+            if problem:
+                self.message = problem
+                return
+            # Another hand may still be carrying the same part: only one of each per kite
+            if any(obj is not None and obj.type == btn.action_id for obj in self.hands.held):
+                self.message = f"{btn.text} is already taken!"
+                return
+
+            obj = DraggableObject(len(self.objects), btn.action_id)
+            if btn.action_id == 'paper':
+                obj.color = self.kite_color
+            self.message = f"Grabbed {btn.text}!"
+        else:
+            return
+        self.hands.held[slot] = obj
+
+    def release_lost(self, slot):
+        """A hand left for good: its stick / paper stays where it was, a color blob is discarded."""
+        obj = self.hands.held[slot]
+        if obj is None:
+            return
+        if obj.type == 'color_blob':
+            self.hands.held[slot] = None
+        else:
+            self.place_current(slot)
+            self.message = "Hand lost, placed!"
+
     def run(self):
         self.running = True
         self.screenshot_pending = False
         
+        if self.pipelined:
+            self.run_pipelined()
+            return
+        
+        img = None
         while self.running:
-            success, img = self.cap.read()
+            success, img = self.cap.read(img) # Captures into the previous frame's buffer
             if not success: break
             
             img = self.process_frame(img)
             
             cv2.imshow("Gravity AR Kite", img)
-            if cv2.waitKey(1) & 0xFF == 27:
-                break
+            if not self.first_frame_done:
+                self.report_startup()
+            self.handle_key(cv2.waitKey(1) & 0xFF)
                 
+        self.close()
+        self.cap.release()
+        cv2.destroyAllWindows()
+
+    def run_pipelined(self):
+        # Capture and inference run on worker threads connected by latest-frame-wins queues,
+        # rendering and imshow stay here on the main thread.
+        pipeline = FramePipeline(self.cap.read, self.infer_frame).start()
+        
+        while self.running:
+            item = pipeline.get()
+            if item is None: break # Camera stopped
+            
+            img = self.render_frame(*item)
+            
+            cv2.imshow("Gravity AR Kite", img)
+            pipeline.release(img) # Back to the capture pool (imshow keeps its own copy)
+            if not self.first_frame_done:
+                self.report_startup()
+            self.handle_key(cv2.waitKey(1) & 0xFF)
+        
+        pipeline.stop()
+        self.close()
         self.cap.release()
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    app = KiteApp()
+    import sys
+    max_hands = int(sys.argv[sys.argv.index("--hands") + 1]) if "--hands" in sys.argv else 2
+    trace = sys.argv[sys.argv.index("--record-trace") + 1] if "--record-trace" in sys.argv else None
+    app = KiteApp(pipelined="--pipelined" in sys.argv, profile="--profile" in sys.argv, max_hands=max_hands,
+                  record_trace=trace)
     app.run()
@@ -0,0 +1,304 @@
+import math
+import cv2
+import numpy as np
+from scene import SceneStore
+from ui_components import draw_batched
+from kite_wall import WALL_COLORS, DEFAULT_KITE, kite_design
+
+PAPER_SIZE = 90 # Center to corner of the paper diamond at scale 1 (see render_shape)
+TAIL_LENGTH = 170 # Length of the paper's tail at scale 1
+
+class WindField:
+    """
+    Gusty wind as value noise: a small lattice of random wind vectors per key time, blended
+    smoothly from one key time to the next and resized to a coarse grid over the frame once
+    per frame. Looking up the wind for any number of points is then a single gather.
+    """
+    def __init__(self, mean=(110.0, -20.0), gust=90.0, period=2.5, lattice=(5, 7), keys=16, step=16, seed=0):
+        rng = np.random.default_rng(seed)
+        self.keys = rng.normal(0, gust, (keys, *lattice, 2)).astype(np.float32)
+        self.mean = np.array(mean, np.float32) # px/s
+        self.period = period # seconds between key times
+        self.step = step # px per grid cell
+        self.grid = None # (2, rows, cols): x and y wind planes
+
+    def update(self, t, shape):
+        """Computes the wind grid over a frame of shape at time t (seconds)."""
+        phase = t / self.period
+        i = math.floor(phase)
+        f = phase - i
+        f = f * f * (3 - 2 * f) # Smoothstep: no kinks at the key times
+        n = len(self.keys)
+        field = self.keys[i % n] * (1 - f) + self.keys[(i + 1) % n] * f + self.mean
+        h, w = shape[:2]
+        grid = cv2.resize(field, (w // self.step + 1, h // self.step + 1), interpolation=cv2.INTER_CUBIC)
+        self.grid = np.ascontiguousarray(grid.transpose(2, 0, 1))
+        return self.grid
+
+    def sample(self, x, y):
+        """Wind (px/s) at points x, y as a (2, *x.shape) array; points off the frame get the wind at its edge."""
+        _, gh, gw = self.grid.shape
+        ix = np.clip((x * (1 / self.step)).astype(np.intp), 0, gw - 1)
+        iy = np.clip((y * (1 / self.step)).astype(np.intp), 0, gh - 1)
+        return self.grid[:, iy, ix]
+
+class FlightSim:
+    """
+    Flight physics for many kites at once, as Verlet particles in struct-of-arrays form.
+    Each kite is a chain of nodes: its manjha from the anchor (node 0) to the kite (node
+    rope_nodes - 1), then its tail, hanging from the bottom of the paper. The kite node is
+    pushed by wind drag and lift and tethered to rope_length from the anchor; manjha and
+    tail nodes feel gravity and wind drag and are held together by distance constraints.
+
+    Node positions are stored planar and split by parity, cur[0] holding the even nodes
+    and cur[1] the odd ones, each (2, kites, n) for x and y. The constraints are solved in
+    two halves, even links (node 2j to 2j + 1) then odd links (2j + 1 to 2j + 2), and each
+    half only touches contiguous slices of the two arrays, so a solver pass is a few NumPy
+    operations over all kites however many kites and nodes there are.
+
+    Physics runs at a fixed substep rate, decoupled from the frame rate: step(t) advances
+    by as many substeps as fit into the time since the previous call. After a stall at
+    most max_substeps are run, so slow frames slow the flight down instead of blowing it up.
+    """
+    gravity, rope_gravity = 500.0, 150.0 # px/s², the manjha is light
+    rope_drag, tail_drag, kite_drag = 0.8, 5.0, 3.0 # 1/s, pull towards the wind velocity
+    lift = 9.0 # Upward px/s² per px/s of wind speed at the kite
+    damping = 0.999
+    slack = 1.04 # Manjha length / tether length, the manjha sags a little when taut
+
+    def __init__(self, kites, rope_nodes=48, tail_nodes=16, rope_length=300.0, tail_length=100.0,
+                 tail_offset=45.0, bounds=(1280, 720), wind=None, substep_hz=120.0, iterations=2, max_substeps=8):
+        self.kites = kites
+        self.rope_nodes = rope_nodes
+        self.nodes = rope_nodes + tail_nodes
+        self.kite = rope_nodes - 1 # Node index of the kite
+        self.tail = rope_nodes # Node index of the tail's root
+        self.bounds = np.array(bounds, np.float32)
+        self.wind = wind or WindField()
+        self.dt = 1.0 / substep_hz
+        self.iterations = iterations
+        self.max_substeps = max_substeps
+
+        self.rope_length = np.broadcast_to(np.asarray(rope_length, np.float32), (kites,)).copy()
+        self.tail_offset = np.broadcast_to(np.asarray(tail_offset, np.float32), (kites,)).copy()
+        tail_length = np.broadcast_to(np.asarray(tail_length, np.float32), (kites,))
+        self.tail_rest = tail_length / max(tail_nodes - 1, 1)
+
+        # Per node: inverse mass (0 = pinned: the anchor, the kite and the tail root), gravity and drag
+        inv_mass = np.ones(self.nodes, np.float32)
+        inv_mass[[0, self.kite, self.tail]] = 0
+        gravity = np.full(self.nodes, self.gravity, np.float32)
+        gravity[:self.kite] = self.rope_gravity
+        drag = np.full(self.nodes, self.rope_drag, np.float32)
+        drag[self.tail:] = self.tail_drag
+        drag[self.kite] = self.kite_drag
+        keep = self.damping - drag * self.dt # Velocity kept per substep, drag included
+        self.gravity_by_parity = [gravity[p::2] for p in (0, 1)]
+        self.drag_by_parity = [drag[p::2] for p in (0, 1)]
+        self.keep_by_parity = [keep[p::2] for p in (0, 1)]
+
+        shapes = [(2, kites, len(range(p, self.nodes, 2))) for p in (0, 1)]
+        self.cur = [np.zeros(shape, np.float32) for shape in shapes]
+        self.prev = [np.zeros(shape, np.float32) for shape in shapes]
+        self.vel = [np.zeros(shape, np.float32) for shape in shapes]
+        self.force = [np.zeros(shape, np.float32) for shape in shapes] # Per-substep displacement
+        self.anchor = np.zeros((kites, 2), np.float32)
+
+        # Per link (node i to i + 1): rest length per kite, and the share of the correction each end takes
+        rest = np.zeros((kites, self.nodes - 1), np.float32)
+        rest[:, :self.kite] = (self.rope_length * self.slack / (rope_nodes - 1))[:, None]
+        rest[:, self.tail:] = self.tail_rest[:, None]
+        wa, wb = inv_mass[:-1], inv_mass[1:]
+        total = np.maximum(wa + wb, 1e-12) # The kite-to-tail link has two pinned ends: no correction
+        share_a, share_b = wa / total, wb / total
+        self.links = []
+        for p in (0, 1):
+            m = rest[:, p::2].shape[1]
+            a = self.cur[p][:, :, :m] # Link starts: nodes p, p + 2, ...
+            b = self.cur[1 - p][:, :, p:p + m] # Link ends: nodes p + 1, p + 3, ...
+            buffers = (np.zeros((2, kites, m), np.float32), np.zeros((kites, m), np.float32),
+                       np.zeros((2, kites, m), np.float32))
+            self.links.append((a, b, np.ascontiguousarray(rest[:, p::2]), share_a[p::2], share_b[p::2], buffers))
+
+        self.t = None
+        self.accumulator = 0.0
+
+    def node(self, i):
+        """View of node i of every kite, (2, kites)."""
+        return self.cur[i % 2][:, :, i // 2]
+
+    def positions(self, out=None):
+        """Node positions of every kite as (kites, nodes, 2)."""
+        out = np.empty((self.kites, self.nodes, 2), np.float32) if out is None else out
+        for p in (0, 1):
+            out[:, p::2] = self.cur[p].transpose(1, 2, 0)
+        return out
+
+    def reset(self, anchor):
+        """Puts every kite at rest downwind of its anchor, with a straight manjha and a hanging tail."""
+        self.anchor[:] = anchor
+        kite = self.anchor + self.rope_length[:, None] * np.array([0.5, -0.87], np.float32)
+        pos = np.empty((self.kites, self.nodes, 2), np.float32)
+        along = np.linspace(0, 1, self.rope_nodes, dtype=np.float32)[None, :, None]
+        pos[:, :self.rope_nodes] = self.anchor[:, None] + (kite - self.anchor)[:, None] * along
+        drop = np.arange(self.nodes - self.tail, dtype=np.float32)[None, :] * self.tail_rest[:, None]
+        pos[:, self.tail:, 0] = kite[:, None, 0]
+        pos[:, self.tail:, 1] = kite[:, None, 1] + self.tail_offset[:, None] + drop
+        for p in (0, 1):
+            self.cur[p][:] = pos[:, p::2].transpose(2, 0, 1)
+            self.prev[p][:] = self.cur[p]
+        self.t = None
+        self.accumulator = 0.0
+
+    def step(self, t):
+        """Advances the simulation to time t (seconds). Returns the number of substeps run."""
+        if self.t is None:
+            self.t = t
+        self.accumulator += min(max(t - self.t, 0.0), self.max_substeps * self.dt)
+        self.t = t
+        substeps = int(self.accumulator / self.dt)
+        if not substeps:
+            return 0
+        self.accumulator -= substeps * self.dt
+        self.apply_wind(t) # The wind changes slowly, once per frame is enough
+        for _ in range(substeps):
+            self.substep()
+        return substeps
+
+    def apply_wind(self, t):
+        self.wind.update(t, self.bounds[::-1].astype(int))
+        for p in (0, 1):
+            force = self.force[p]
+            np.multiply(self.wind.sample(self.cur[p][0], self.cur[p][1]), self.drag_by_parity[p], out=force)
+            force[1] += self.gravity_by_parity[p]
+            if p == self.kite % 2:
+                wind = self.wind.sample(*self.node(self.kite))
+                force[1, :, self.kite // 2] -= self.lift * np.hypot(wind[0], wind[1])
+            force *= self.dt * self.dt
+
+    def substep(self):
+        for p in (0, 1):
+            cur, prev, vel = self.cur[p], self.prev[p], self.vel[p]
+            np.subtract(cur, prev, out=vel)
+            prev[:] = cur
+            vel *= self.keep_by_parity[p]
+            cur += vel
+            cur += self.force[p]
+
+        # The kite can't fly further from the anchor than the manjha is long
+        kite = self.node(self.kite)
+        anchor = self.anchor.T
+        d = kite - anchor
+        d /= np.maximum(np.hypot(d[0], d[1]) / self.rope_length, 1.0)
+        np.add(anchor, d, out=kite)
+        np.clip(kite, 0, self.bounds[:, None], out=kite)
+
+        self.node(0)[:] = anchor
+        root = self.node(self.tail)
+        root[0] = kite[0]
+        np.add(kite[1], self.tail_offset, out=root[1])
+        for _ in range(self.iterations):
+            for link in self.links:
+                self.solve(*link)
+
+    @staticmethod
+    def solve(a, b, rest, share_a, share_b, buffers):
+        """One pass over every other link: moves the two ends of each towards its rest length."""
+        d, dist, corr = buffers
+        np.subtract(b, a, out=d)
+        np.hypot(d[0], d[1], out=dist)
+        dist += 1e-6
+        np.divide(rest, dist, out=dist)
+        np.subtract(1.0, dist, out=dist) # Fraction of the link to take back
+        d *= dist
+        np.multiply(d, share_a, out=corr)
+        a += corr
+        np.multiply(d, share_b, out=corr)
+        b -= corr
+
+class KiteFlight:
+    """
+    Flight display mode: the built kite flies on a manjha held by every tracked hand, the
+    hand being the string anchor, in a sky of festival kites tethered below the frame. One
+    FlightSim steps the manjhas and tails of all kites together. Kites are drawn with
+    draw_batched, all manjhas with one cv2.polylines call and the tails with one per color.
+    """
+    def __init__(self, hand_kites=2, sky_kites=24, rope_nodes=48, tail_nodes=16, hand_scale=0.5, sky_scale=0.25,
+                 palette=WALL_COLORS, seed=0):
+        self.hand_kites = hand_kites
+        self.sky_kites = sky_kites
+        self.rope_nodes = rope_nodes
+        self.tail_nodes = tail_nodes
+        self.hand_scale = hand_scale
+        self.sky_scale = sky_scale
+        self.palette = palette
+        self.seed = seed
+        self.shape = None
+        self.design = DEFAULT_KITE
+
+    def build(self, objects, shape):
+        """Sets up the kites for a frame of shape, the hand kites in the design of the placed objects."""
+        self.design = kite_design(objects) or self.design
+        h, w = shape[:2]
+        rng = np.random.default_rng(self.seed)
+        hands, sky = self.hand_kites, self.sky_kites
+        scale = np.array([self.hand_scale] * hands + [self.sky_scale] * sky, np.float32)
+        rope_length = np.concatenate([np.full(hands, 0.42 * h), rng.uniform(0.35, 0.75, sky) * h])
+        self.sim = FlightSim(hands + sky, self.rope_nodes, self.tail_nodes, rope_length,
+                             TAIL_LENGTH * scale, PAPER_SIZE * scale, bounds=(w, h))
+
+        # Hand kites wait at the bottom until their hand shows up, sky kites are spread along it
+        anchor = np.zeros((hands + sky, 2), np.float32)
+        anchor[:hands, 0] = w * (np.arange(hands) + 1) / (hands + 1)
+        anchor[:hands, 1] = h - 60
+        anchor[hands:, 0] = rng.permutation(np.linspace(-0.1 * w, 0.85 * w, sky)) # The wind blows them right
+        anchor[hands:, 1] = h + 20
+        self.sim.reset(anchor)
+
+        paper_color = next((c for t, _, c in self.design if t == 'paper'), DEFAULT_KITE[-1][2])
+        sky_colors = np.array(self.palette, np.uint8)[np.arange(sky) % len(self.palette)]
+        self.groups = [
+            self._group(DEFAULT_KITE, slice(hands, None), self.sky_scale, sky_colors),
+            self._group(self.design, slice(0, hands), self.hand_scale, np.tile(np.uint8(paper_color), (hands, 1))),
+        ]
+        self.shape = shape
+
+    @staticmethod
+    def _group(design, kites, scale, paper_colors):
+        """Kites drawn together: a SceneStore with the design per kite and the tails by color."""
+        count = len(paper_colors)
+        types = [t for t, _, _ in design]
+        colors = np.tile(np.array([c for _, _, c in design], np.uint8), (count, 1)).reshape(count, len(types), 3)
+        colors[:, [t == 'paper' for t in types]] = paper_colors[:, None]
+        store = SceneStore(max(count * len(types), 1))
+        store.extend(types * count, np.zeros((count * len(types), 2)), colors.reshape(-1, 3))
+        offsets = np.array([offset for _, offset, _ in design], np.float32) * scale
+
+        unique, which = np.unique(paper_colors, axis=0, return_inverse=True)
+        tails = [(tuple(int(v) // 2 for v in c), np.flatnonzero(which.ravel() == i)) for i, c in enumerate(unique)]
+        return kites, store, offsets, scale, tails, max(1, round(6 * scale))
+
+    def fly(self, t, shape, cursors=(), active=(), objects=()):
+        """
+        Moves the hand kites' anchors to the active hands' cursors and steps the physics to
+        time t, setting the kites up first if the frame size changed.
+        """
+        if shape != self.shape:
+            self.build(objects, shape)
+        hands = np.flatnonzero(np.asarray(active[:self.hand_kites], bool))
+        self.sim.anchor[hands] = np.asarray(cursors)[hands]
+        return self.sim.step(t)
+
+    def draw(self, img, detail=0):
+        sim = self.sim
+        pos = sim.positions()
+        pts = np.rint(pos).astype(np.int32)
+        for kites, store, offsets, scale, tails, thickness in self.groups:
+            group = pts[kites]
+            cv2.polylines(img, list(group[:, :sim.rope_nodes]), False, (240, 240, 240), 1) # Manjha
+            for color, sel in tails:
+                cv2.polylines(img, list(group[sel, sim.tail:]), False, color, thickness)
+            kite_pos = pos[kites, sim.kite]
+            store.pos[:len(store)] = (kite_pos[:, None] + offsets[None]).reshape(-1, 2)
+            draw_batched(img, store, scale, detail, strings=False)
+        return img
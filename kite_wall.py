@@ -0,0 +1,81 @@
+import math
+import numpy as np
+from scene import SceneStore
+from ui_components import draw_batched, shape_bounds
+
+# Paper colors the copies cycle through (the first copy keeps the built kite's colors)
+WALL_COLORS = [(0, 200, 255), (0, 0, 255), (255, 0, 0), (0, 255, 0), (255, 0, 255), (0, 128, 255)]
+# Used when nothing has been built yet: (type, offset from the kite center, color)
+DEFAULT_KITE = [("stick1", (0, 0), (0, 255, 255)), ("stick2", (0, 0), (0, 255, 255)), ("paper", (0, 0), (0, 200, 255))]
+
+def kite_design(objects):
+    """The placed objects as (type, offset from the paper, color), or None if nothing is placed."""
+    placed = [obj for obj in objects if obj.pos != (0, 0)]
+    if not placed:
+        return None
+    ref = next((obj.pos for obj in placed if obj.type == 'paper'), placed[0].pos)
+    return [(obj.type, (obj.pos[0] - ref[0], obj.pos[1] - ref[1]), obj.color) for obj in placed]
+
+def design_bounds(design, strings=True):
+    """(x0, y0, x1, y1) around the design's reference point at scale 1."""
+    x0 = y0 = math.inf
+    x1 = y1 = -math.inf
+    for obj_type, (dx, dy), _ in design:
+        bx0, by0, bx1, by1 = shape_bounds(obj_type, strings=strings)
+        x0, y0, x1, y1 = min(x0, bx0 + dx), min(y0, by0 + dy), max(x1, bx1 + dx), max(y1, by1 + dy)
+    return x0, y0, x1, y1
+
+class KiteWall:
+    """
+    "Kite wall" display mode: the kite built in the scene repeated count times over the
+    frame, swaying in the wind. All copies live in one SceneStore and are drawn with
+    draw_batched, so 1,000+ elements cost a few dozen OpenCV calls per frame.
+    """
+    def __init__(self, count=400, sway=0.08, palette=WALL_COLORS):
+        self.count = count
+        self.sway = sway # sway amplitude as a fraction of the cell width
+        self.palette = palette
+        self.store = SceneStore(count * 3)
+        self.shape = None
+        self.design = DEFAULT_KITE
+
+    def build(self, objects, shape):
+        """Lays out count copies of the placed objects (or DEFAULT_KITE) to fill a frame of shape."""
+        self.design = kite_design(objects) or self.design
+
+        # Union of the design's bounds decides the cell aspect and the scale
+        x0, y0, x1, y1 = design_bounds(self.design)
+        dw, dh = x1 - x0, y1 - y0
+        h, w = shape[:2]
+        cols = max(1, math.ceil(math.sqrt(self.count * w * dh / (h * dw))))
+        rows = math.ceil(self.count / cols)
+        cell_w, cell_h = w / cols, h / rows
+        self.scale = min(cell_w / dw, cell_h / dh)
+
+        # Kite anchors: centered in their cells
+        i = np.arange(self.count)
+        anchors = np.stack([(i % cols) * cell_w + (cell_w - dw * self.scale) / 2 - x0 * self.scale,
+                            (i // cols) * cell_h + (cell_h - dh * self.scale) / 2 - y0 * self.scale], axis=1)
+
+        types = [obj_type for obj_type, _, _ in self.design]
+        offsets = np.array([offset for _, offset, _ in self.design], np.float32) * self.scale
+        colors = np.array([color for _, _, color in self.design], np.uint8)
+        all_colors = np.tile(colors, (self.count, 1)).reshape(self.count, len(types), 3)
+        papers = np.array([t == 'paper' for t in types])
+        all_colors[1:, papers] = np.array(self.palette, np.uint8)[i[1:] % len(self.palette), None]
+
+        self.store.clear()
+        self.base = (anchors[:, None] + offsets[None]).reshape(-1, 2)
+        self.store.extend(types * self.count, self.base, all_colors.reshape(-1, 3))
+        self.phase = np.repeat(np.random.default_rng(0).uniform(0, 2 * np.pi, self.count), len(types))
+        self.amplitude = self.sway * cell_w
+        self.shape = shape
+
+    def draw(self, img, t, objects=(), detail=0):
+        """Draws the wall at time t (seconds), laying it out first if the frame size changed."""
+        if img.shape != self.shape:
+            self.build(objects, img.shape)
+        n = len(self.store)
+        sway = np.stack([np.sin(1.3 * t + self.phase), 0.5 * np.sin(2.1 * t + self.phase)], axis=1)
+        np.add(self.base, sway * self.amplitude, out=self.store.pos[:n], casting="unsafe")
+        return draw_batched(img, self.store, self.scale, detail)
@@ -0,0 +1,158 @@
+import shutil
+import numpy as np
+from hand_tracking import HandDetector, NUM_LANDMARKS, draw_hand_landmarks
+
+# File layout: 32-byte header (magic, then uint32 version, max_hands, frame width, frame height,
+# zero padding), followed by fixed-stride records of trace_dtype(max_hands) until the end
+# of the file. The record count follows from the file size, so a trace cut off by a crash
+# still opens (a partial last record is ignored).
+TRACE_MAGIC = b"KITETRC1"
+TRACE_VERSION = 1
+HEADER_SIZE = 32
+HANDEDNESS = {"Left": 0, "Right": 1} # -1 = unknown
+
+def trace_dtype(max_hands):
+    """One frame of HandDetector output."""
+    return np.dtype([
+        ("t", "<f8"), # seconds, the app clock the gesture filters saw
+        ("latency", "<f4"), # seconds the cursor was predicted forward by
+        ("num_hands", "u1"),
+        ("present", "?", (max_hands,)),
+        ("handedness", "i1", (max_hands,)),
+        ("score", "<f4", (max_hands,)),
+        ("landmarks", "<f4", (max_hands, NUM_LANDMARKS, 3)), # normalized, as the model returns them
+    ], align=True)
+
+def _header(max_hands, frame_size):
+    fields = np.array([TRACE_VERSION, max_hands, frame_size[0], frame_size[1]], "<u4").tobytes()
+    return (TRACE_MAGIC + fields).ljust(HEADER_SIZE, b"\0")
+
+def read_header(path):
+    """(max_hands, (width, height)) of a trace file."""
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SIZE)
+    if len(head) < HEADER_SIZE or head[:8] != TRACE_MAGIC:
+        raise ValueError(f"{path} is not a landmark trace")
+    version, max_hands, width, height = np.frombuffer(head, "<u4", 4, 8)
+    if version != TRACE_VERSION:
+        raise ValueError(f"{path}: unsupported trace version {version}")
+    return int(max_hands), (int(width), int(height))
+
+def open_trace(path):
+    """
+    Memory-maps a trace file read-only as a structured array of trace_dtype records.
+    Nothing is loaded up front: pages are read from disk as records are accessed.
+    """
+    max_hands, _ = read_header(path)
+    dtype = trace_dtype(max_hands)
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        count = (f.tell() - HEADER_SIZE) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype)
+    return np.memmap(path, dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+def concat_traces(parts, path):
+    """Joins trace files recorded with the same max_hands into one."""
+    max_hands, frame_size = read_header(parts[0])
+    with open(path, "wb") as out:
+        out.write(_header(max_hands, frame_size))
+        for part in parts:
+            if read_header(part)[0] != max_hands:
+                raise ValueError(f"{part}: max_hands differs from {parts[0]}")
+            with open(part, "rb") as f:
+                f.seek(HEADER_SIZE)
+                shutil.copyfileobj(f, out)
+
+class TraceRecorder:
+    """
+    Appends the landmarks HandDetector produces to a trace file, one fixed-size record per
+    frame. Records are staged in a small preallocated buffer and written in blocks, so
+    recording costs a few microseconds per frame.
+    """
+    def __init__(self, path, max_hands, frame_size=(1280, 720), buffer_frames=256):
+        self.path = path
+        self.buffer = np.zeros(buffer_frames, trace_dtype(max_hands))
+        self.staged = 0
+        self.frames = 0
+        self.file = open(path, "wb")
+        self.file.write(_header(max_hands, frame_size))
+
+    def record(self, t, detector, latency=0.0):
+        """Records the hands of detector's last find_position() call at time t."""
+        rec = self.buffer[self.staged]
+        n = detector.num_hands
+        rec["t"] = t
+        rec["latency"] = latency
+        rec["num_hands"] = n
+        rec["present"] = np.arange(len(rec["present"])) < n
+        rec["landmarks"][:n] = detector.landmarks[:n]
+        rec["handedness"] = -1
+        rec["score"] = 0.0
+        handedness = getattr(detector.results, "multi_handedness", None) or ()
+        for k, hand in enumerate(handedness[:n]):
+            label = hand.classification[0]
+            rec["handedness"][k] = HANDEDNESS.get(label.label, -1)
+            rec["score"][k] = label.score
+
+        self.staged += 1
+        self.frames += 1
+        if self.staged == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer[:self.staged].tobytes())
+        self.file.flush()
+        self.staged = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+class TraceReplayDetector(HandDetector):
+    """
+    Drop-in HandDetector that serves a recorded trace instead of running the model, one
+    record per detect() call, without mediapipe. The trace is memory-mapped and records
+    are read in place, so traces of any length replay without being loaded into RAM.
+    clock() returns the recorded time of the current frame, which keeps the gesture
+    filters on the original timeline whatever speed the trace is replayed at.
+
+        detector = TraceReplayDetector("session.trace")
+        app = KiteApp(use_camera=False, detector=detector)
+        app.clock = detector.clock
+    """
+    def __init__(self, trace, start=0, **kwargs):
+        self.trace = open_trace(trace) if isinstance(trace, str) else trace
+        kwargs.setdefault("max_hands", self.trace.dtype["present"].shape[0])
+        super().__init__(**kwargs)
+        self.frame_index = start
+        self.record = np.zeros((), self.trace.dtype) # Served once the trace has run out
+
+    def __len__(self):
+        return len(self.trace)
+
+    def warm_up(self, frame_shape=(720, 1280, 3)):
+        return {} # No model
+
+    def detect(self, img):
+        if self.frame_index < len(self.trace):
+            self.record = self.trace[self.frame_index]
+        else:
+            self.record = np.zeros((), self.trace.dtype)
+        self.frame_index += 1
+        return self.record
+
+    def clock(self):
+        return float(self.record["t"])
+
+    def find_hands(self, img, draw=True, results=None):
+        self.results = self.detect(img) if results is None else results
+        if draw:
+            for hand in self.results["landmarks"][:int(self.results["num_hands"])]:
+                draw_hand_landmarks(img, hand)
+        return img
+
+    def _load_landmarks(self, results):
+        n = min(int(results["num_hands"]), self.max_hands) if results is not None else 0
+        self.landmarks[:n] = results["landmarks"][:n]
+        return n
@@ -0,0 +1,112 @@
+import abc
+import os
+import queue
+import threading
+import cv2
+
+class BackgroundWriter(abc.ABC):
+    """
+    Runs write(item) on a worker thread fed by a bounded queue, so disk I/O and encoding stay
+    off the render loop. submit() never blocks: when the queue is full the item is dropped
+    and counted.
+    """
+    def __init__(self, maxsize=8, name="writer"):
+        self.queue = queue.Queue(maxsize)
+        self.closing = False
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        """Queues item for writing. Returns False if it had to be dropped."""
+        if self.closing:
+            return False
+        self.submitted += 1
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, wait=True):
+        """Stops accepting items; the worker finishes what is queued. wait=False returns immediately."""
+        self.closing = True
+        if wait:
+            self.thread.join()
+
+    def stats(self):
+        return {"submitted": self.submitted, "written": self.written, "dropped": self.dropped,
+                "failed": self.failed, "queued": self.queue.qsize()}
+
+    @abc.abstractmethod
+    def write(self, item):
+        """Writes one item on the worker thread. Returns whether it was written."""
+
+    def finish(self):
+        """Called on the worker thread once the queue is drained after close()."""
+
+    def _loop(self):
+        while not (self.closing and self.queue.empty()):
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                ok = self.write(item)
+            except (OSError, cv2.error):
+                ok = False
+            if ok:
+                self.written += 1
+            else:
+                self.failed += 1
+        self.finish()
+
+class ScreenshotWriter(BackgroundWriter):
+    """Encodes and saves screenshots in the background."""
+    def __init__(self, directory="screenshots", maxsize=4):
+        super().__init__(maxsize, name="screenshots")
+        self.directory = directory
+
+    def save(self, img):
+        """Queues a copy of img and returns the file name it will be saved to (None if dropped)."""
+        filename = os.path.join(self.directory, f"kite_{int(cv2.getTickCount())}.jpg")
+        return filename if self.submit((filename, img.copy())) else None
+
+    def write(self, item):
+        filename, img = item
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        return cv2.imwrite(filename, img)
+
+class SessionRecorder(BackgroundWriter):
+    """
+    Streams rendered frames into a video file from a dedicated encoder thread.
+    .mp4 is written with mp4v, anything else (e.g. .avi) as MJPEG. Frames are stored at a
+    fixed fps, so the video plays back at real speed only if the app renders at about that rate.
+    """
+    def __init__(self, path, fps=30.0, maxsize=32):
+        super().__init__(maxsize, name="recorder")
+        self.path = path
+        self.fps = fps
+        self.video = None # opened on the encoder thread with the first frame's size
+
+    def add(self, img):
+        return self.submit(img.copy())
+
+    def write(self, img):
+        if self.video is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fourcc = cv2.VideoWriter_fourcc(*("mp4v" if self.path.lower().endswith(".mp4") else "MJPG"))
+            h, w = img.shape[:2]
+            self.video = cv2.VideoWriter(self.path, fourcc, self.fps, (w, h))
+        if not self.video.isOpened():
+            return False
+        self.video.write(img)
+        return True
+
+    def finish(self):
+        if self.video is not None:
+            self.video.release()
@@ -0,0 +1,130 @@
+import threading
+from collections import deque
+import numpy as np
+
+class FramePool:
+    """
+    Free list of frame buffers. acquire() hands out a free buffer of the requested shape and
+    only allocates when none is free; release() returns a buffer once nothing uses it anymore.
+    """
+    def __init__(self, max_free=8):
+        self.free = []
+        self.lock = threading.Lock()
+        self.max_free = max_free
+        self.allocated = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        with self.lock:
+            for i, buf in enumerate(self.free):
+                if buf.shape == shape and buf.dtype == dtype:
+                    return self.free.pop(i)
+            self.allocated += 1
+        return np.empty(shape, dtype)
+
+    def release(self, buf):
+        with self.lock:
+            if len(self.free) < self.max_free:
+                self.free.append(buf)
+
+class LatestFrameQueue:
+    """
+    Bounded queue where the newest item always wins.
+    put() never blocks: when the queue is full the oldest item is dropped, so a slow
+    consumer sees fresh frames instead of an ever growing backlog.
+    """
+    def __init__(self, maxsize=1, on_drop=None):
+        self.items = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+        self.on_drop = on_drop # called with each item that is pushed out unconsumed
+
+    def put(self, item):
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+                if self.on_drop:
+                    self.on_drop(self.items[0])
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Returns the oldest queued item, or None once the queue is closed (or on timeout)."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items or self.closed, timeout):
+                return None
+            return self.items.popleft() if self.items else None
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class FramePipeline:
+    """
+    Capture -> inference pipeline running on two worker threads.
+    capture(frame) fills and returns (success, frame) like cv2.VideoCapture.read(image),
+    infer(frame) returns whatever the render stage needs. The caller pulls finished items
+    with get() and does the rendering / display itself (HighGUI has to stay on the main thread).
+
+    Frames are captured into buffers from a FramePool: infer() should work on the frame in
+    place, and the caller hands it back with release() once it is displayed. Frames dropped
+    by the queues go back to the pool automatically.
+    """
+    def __init__(self, capture, infer, queue_size=1):
+        self.capture = capture
+        self.infer = infer
+        self.pool = FramePool()
+        self.frame_shape = None
+        self.frames = LatestFrameQueue(queue_size, on_drop=self.pool.release) # capture -> inference
+        self.results = LatestFrameQueue(queue_size, on_drop=lambda item: self.pool.release(item[0])) # inference -> render
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        self.running = True
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._infer_loop, name="inference", daemon=True),
+        ]
+        for t in self.threads:
+            t.start()
+        return self
+
+    def get(self, timeout=None):
+        item = self.results.get(timeout)
+        return None if item is None else item[1]
+
+    def release(self, frame):
+        self.pool.release(frame)
+
+    def stop(self):
+        self.running = False
+        self.frames.close()
+        self.results.close()
+        for t in self.threads:
+            t.join(timeout=1.0)
+
+    def stats(self):
+        return {"dropped_capture": self.frames.dropped, "dropped_inference": self.results.dropped,
+                "frames_allocated": self.pool.allocated}
+
+    def _capture_loop(self):
+        try:
+            while self.running:
+                frame = self.pool.acquire(self.frame_shape) if self.frame_shape else None
+                success, frame = self.capture(frame)
+                if not success: break
+                self.frame_shape = frame.shape
+                self.frames.put(frame)
+        finally:
+            self.frames.close()
+
+    def _infer_loop(self):
+        try:
+            while self.running:
+                frame = self.frames.get()
+                if frame is None: break
+                self.results.put((frame, self.infer(frame)))
+        finally:
+            self.results.close()
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from contextlib import nullcontext
+import cv2
+import numpy as np
+from utils import draw_transparent_rect
+
+_NULL_SPAN = nullcontext()
+
+class _Span:
+    """Reusable timing span for one stage on one thread; records into the stage's ring buffer on exit."""
+    __slots__ = ("ring", "start")
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.ring.add(self.start, time.perf_counter() - self.start)
+        return False
+
+class _Ring:
+    """Fixed-size ring buffer of (start, duration, thread) samples."""
+    def __init__(self, capacity):
+        self.starts = np.zeros(capacity)
+        self.durations = np.zeros(capacity)
+        self.threads = np.zeros(capacity, np.int64)
+        self.count = 0
+
+    def add(self, start, duration):
+        i = self.count % len(self.starts)
+        self.starts[i] = start
+        self.durations[i] = duration
+        self.threads[i] = threading.get_ident()
+        self.count += 1
+
+    def samples(self):
+        """Recorded samples in chronological order."""
+        n = min(self.count, len(self.starts))
+        order = np.arange(self.count - n, self.count) % len(self.starts)
+        return self.starts[order], self.durations[order], self.threads[order]
+
+class Profiler:
+    """
+    Per-stage timing spans kept in fixed-size ring buffers.
+    When disabled, span() hands back a shared no-op context, so the spans can stay in the hot path.
+    Spans can be used from several threads (e.g. pipelined inference and rendering): every thread
+    gets its own span objects, the ring buffers per stage are shared.
+
+        with profiler.span("flip"):
+            img = cv2.flip(img, 1)
+    """
+    def __init__(self, enabled=False, capacity=240):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.rings = {} # stage name -> _Ring
+        self.lock = threading.Lock() # Guards adding stages to rings against reading them from another thread
+        self.local = threading.local() # .spans: stage name -> _Span of the calling thread
+        self.frames = _Ring(capacity) # one sample per rendered frame, for FPS
+        self.origin = time.perf_counter()
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        spans = getattr(self.local, "spans", None)
+        if spans is None:
+            spans = self.local.spans = {}
+        span = spans.get(name)
+        if span is None:
+            with self.lock:
+                ring = self.rings.get(name)
+                if ring is None:
+                    ring = self.rings[name] = _Ring(self.capacity)
+            span = spans[name] = _Span(ring)
+        return span
+
+    def _stages(self):
+        """(name, ring) pairs, a snapshot that other threads adding stages cannot change."""
+        with self.lock:
+            return list(self.rings.items())
+
+    def tick(self):
+        """Marks the end of a rendered frame."""
+        if self.enabled:
+            self.frames.add(time.perf_counter(), 0.0)
+
+    def fps(self):
+        starts, _, _ = self.frames.samples()
+        if len(starts) < 2 or starts[-1] <= starts[0]:
+            return 0.0
+        return (len(starts) - 1) / (starts[-1] - starts[0])
+
+    def stage_ms(self):
+        """Mean milliseconds per stage over the buffered samples."""
+        return {name: float(ring.samples()[1].mean() * 1000) for name, ring in self._stages() if ring.count}
+
+    def draw_hud(self, img, extra=None, pos=(270, 80), stages=True):
+        """Draws FPS, any extra (label, value) lines and (if stages) per-stage ms onto img."""
+        lines = [f"FPS {self.fps():5.1f}"]
+        lines += [f"{label} {value}" for label, value in (extra or [])]
+        if stages:
+            lines += [f"{name:<14}{ms:6.2f} ms" for name, ms in self.stage_ms().items()]
+
+        x, y = pos
+        draw_transparent_rect(img, (x, y), (x + 250, y + 10 + 20 * len(lines)), (0, 0, 0), 0.5)
+        for i, line in enumerate(lines):
+            cv2.putText(img, line, (x + 8, y + 22 + 20 * i), cv2.FONT_HERSHEY_PLAIN, 1.1, (0, 255, 0), 1)
+        return img
+
+    def events(self):
+        """All buffered spans as (name, start_s, duration_s, thread) sorted by start time."""
+        events = []
+        for name, ring in self._stages():
+            for start, duration, thread in zip(*ring.samples()):
+                events.append((name, start - self.origin, duration, int(thread)))
+        events.sort(key=lambda e: e[1])
+        return events
+
+    def export_jsonl(self, path):
+        with open(path, "w") as f:
+            for name, start, duration, thread in self.events():
+                f.write(json.dumps({"stage": name, "start_ms": start * 1000,
+                                    "dur_ms": duration * 1000, "thread": thread}) + "\n")
+
+    def export_chrome_trace(self, path):
+        """Writes the spans in Chrome trace format (open with chrome://tracing or Perfetto)."""
+        trace = [{"name": name, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6, "pid": 0, "tid": thread}
+                 for name, start, duration, thread in self.events()]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace}, f)
@@ -0,0 +1,73 @@
+import time
+from collections import deque
+from types import SimpleNamespace
+
+# Highest quality first.
+#   sprite_detail     index into ui_components.DETAIL_LEVELS (glow, tail points, paper stripes)
+#   text_outline      black outline behind the festive text
+#   draw_landmarks    hand skeleton overlay
+#   hud_stages        per-stage timings in the HUD (FPS and extra lines are always shown)
+#   inference_scale   factor on the detector's own inference_scale
+#   infer_every       run the model at most every n-th frame (extrapolated in between)
+QUALITY_TIERS = [
+    SimpleNamespace(name="high", sprite_detail=0, text_outline=True, draw_landmarks=True, hud_stages=True,
+                    inference_scale=1.0, infer_every=1),
+    SimpleNamespace(name="medium", sprite_detail=1, text_outline=True, draw_landmarks=True, hud_stages=True,
+                    inference_scale=1.0, infer_every=2),
+    SimpleNamespace(name="low", sprite_detail=2, text_outline=False, draw_landmarks=False, hud_stages=False,
+                    inference_scale=0.8, infer_every=2),
+    SimpleNamespace(name="minimal", sprite_detail=2, text_outline=False, draw_landmarks=False, hud_stages=False,
+                    inference_scale=0.66, infer_every=3),
+]
+
+class QualityGovernor:
+    """
+    Steps through quality tiers to keep the per-frame work time within the budget of target_fps.
+
+    Hysteresis keeps it from oscillating: it drops a tier as soon as the recent mean frame time
+    is over budget, but only goes back up after a full window well under budget
+    (below upgrade_headroom * budget), and every change is followed by a dwell time
+    (min_dwell before dropping again, upgrade_dwell before going back up).
+    """
+    def __init__(self, target_fps=30.0, window=30, upgrade_headroom=0.6, min_dwell=1.0, upgrade_dwell=3.0,
+                 tiers=QUALITY_TIERS, enabled=True):
+        self.budget = 1.0 / target_fps
+        self.upgrade_headroom = upgrade_headroom
+        self.min_dwell = min_dwell
+        self.upgrade_dwell = upgrade_dwell
+        self.tiers = tiers
+        self.enabled = enabled
+        self.level = 0
+        self.frame_times = deque(maxlen=window)
+        self.last_change = time.perf_counter()
+
+    @property
+    def tier(self):
+        return self.tiers[self.level]
+
+    def update(self, frame_time, now=None):
+        """Records one frame's work time (seconds). Returns True if the tier changed."""
+        if not self.enabled:
+            return False
+        now = time.perf_counter() if now is None else now
+        self.frame_times.append(frame_time)
+        n = len(self.frame_times)
+        mean = sum(self.frame_times) / n
+        dwell = now - self.last_change
+
+        if (mean > self.budget and n >= self.frame_times.maxlen // 2 and dwell >= self.min_dwell
+                and self.level < len(self.tiers) - 1):
+            return self.set_level(self.level + 1, now)
+        if (mean < self.budget * self.upgrade_headroom and n == self.frame_times.maxlen
+                and dwell >= self.upgrade_dwell and self.level > 0):
+            return self.set_level(self.level - 1, now)
+        return False
+
+    def set_level(self, level, now=None):
+        level = min(max(level, 0), len(self.tiers) - 1)
+        if level == self.level:
+            return False
+        self.level = level
+        self.last_change = time.perf_counter() if now is None else now
+        self.frame_times.clear() # Old samples describe the previous tier
+        return True
@@ -0,0 +1,249 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from utils import blend_premultiplied, render_premultiplied, split_premultiplied, stack_premultiplied
+
+def _merge_rects(rects):
+    """
+    Merges (x, y, w, h) rects into (x0, y0, x1, y1) rects until no two intersect,
+    so every pixel belongs to at most one of them.
+    """
+    rects = [(x, y, x + w, y + h) for x, y, w, h in rects]
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for r in rects:
+            for i, o in enumerate(out):
+                if r[0] < o[2] and o[0] < r[2] and r[1] < o[3] and o[1] < r[3]:
+                    out[i] = (min(r[0], o[0]), min(r[1], o[1]), max(r[2], o[2]), max(r[3], o[3]))
+                    merged = True
+                    break
+            else:
+                out.append(r)
+        rects = out
+    return rects
+
+class UILayer:
+    """
+    Static UI pre-rendered into a premultiplied BGRA layer.
+    The layer is only rebuilt when the key (hover states, button labels, ...) or the frame size changes.
+    """
+    def __init__(self, draw_fn, merge_radius=15):
+        self.draw_fn = draw_fn # draw_fn(img) draws the whole UI onto img
+        self.merge_radius = merge_radius
+        self.key = None
+        self.shape = None
+        self.layer = None
+        self.tiles = [] # (color, inv_alpha, x, y) patches that actually hold UI pixels
+
+    def rebuild(self, shape):
+        self.layer = render_premultiplied(self.draw_fn, shape)
+        self.shape = shape
+
+        # Split the layer into tiles around the drawn content so that compositing
+        # never touches the (mostly empty) middle of the frame.
+        # Dilate first so glyphs of one line end up in the same tile. The bounding rects of
+        # separate contours can still intersect (e.g. around an L-shaped one), so they are
+        # merged: an overlap sliced into two tiles would be blended twice.
+        mask = (self.layer[:, :, 3] > 0).astype(np.uint8)
+        k = 2 * self.merge_radius + 1
+        mask = cv2.dilate(mask, np.ones((k, k), np.uint8))
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        self.tiles = []
+        for x0, y0, x1, y1 in _merge_rects([cv2.boundingRect(cnt) for cnt in contours]):
+            color, inv_alpha = split_premultiplied(self.layer[y0:y1, x0:x1])
+            self.tiles.append((color, inv_alpha, x0, y0))
+
+    def composite(self, img, key=None):
+        """Blends the UI onto img in place, rebuilding the layer first if needed."""
+        if self.layer is None or key != self.key or img.shape != self.shape:
+            self.rebuild(img.shape)
+            self.key = key
+
+        for color, inv_alpha, x, y in self.tiles:
+            blend_premultiplied(img, color, inv_alpha, x, y)
+        return img
+
+class SpriteCache:
+    """
+    LRU cache of premultiplied sprites.
+    render_fn(key) returns (sprite, anchor): a premultiplied BGRA image and the (x, y)
+    point inside it that lands on the position the sprite is drawn at.
+    Thread-safe: class-level caches are shared by web sessions rendering on their own threads.
+    """
+    def __init__(self, render_fn, max_size=64):
+        self.render_fn = render_fn
+        self.max_size = max_size
+        self.entries = OrderedDict() # key -> (color, inv_alpha, anchor)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry
+
+        # Rendered outside the lock; two threads missing the same key both render it, the last one is kept
+        sprite, anchor = self.render_fn(key)
+        color, inv_alpha = split_premultiplied(sprite)
+        entry = (color, inv_alpha, anchor)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False) # Evict least recently used
+        return entry
+
+    def invalidate(self, key=None):
+        """Drops one sprite, or all of them when key is None."""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+    def blit(self, img, key, pos):
+        """Blends the sprite for key onto img with its anchor at pos."""
+        color, inv_alpha, (ax, ay) = self.get(key)
+        return blend_premultiplied(img, color, inv_alpha, pos[0] - ax, pos[1] - ay)
+
+class TextCache:
+    """
+    LRU cache of rendered text, keyed by (text, font, scale, color, thickness, outline).
+    Each key is rasterized once with cv2.putText into a tight premultiplied sprite and then
+    only blended around its position, so a changing string (the message, "Saved to ...")
+    costs one rasterization per change instead of one per frame.
+    outline is None or (color, thickness, (dx, dy)): a pass drawn under the text, e.g. a shadow.
+    """
+    def __init__(self, max_size=128):
+        self.sprites = SpriteCache(self.render, max_size)
+
+    @staticmethod
+    def render(key):
+        text, font, scale, color, thickness, outline = key
+        passes = ([(outline[0], outline[1], outline[2])] if outline else []) + [(color, thickness, (0, 0))]
+
+        # Union of the passes' extents around the text origin (the baseline's left end)
+        x0 = y0 = x1 = y1 = 0
+        for _, t, (dx, dy) in passes:
+            (w, h), baseline = cv2.getTextSize(text, font, scale, t)
+            pad = t // 2 + 2
+            x0, y0 = min(x0, dx - pad), min(y0, dy - h - pad)
+            x1, y1 = max(x1, dx + w + pad), max(y1, dy + baseline + pad)
+
+        def draw(img):
+            for c, t, (dx, dy) in passes:
+                cv2.putText(img, text, (dx - x0, dy - y0), font, scale, c, t)
+        return render_premultiplied(draw, (y1 - y0, x1 - x0, 3)), (-x0, -y0)
+
+    def put(self, img, text, org, font, scale, color, thickness=1, outline=None):
+        """Draws text like cv2.putText(img, text, org, font, scale, color, thickness), from the cache."""
+        if not text:
+            return img
+        color = tuple(int(c) for c in color)
+        return self.sprites.blit(img, (text, font, scale, color, thickness, outline), org)
+
+class SceneLayer:
+    """
+    Placed objects pre-composited into one persistent premultiplied layer.
+    Objects are painted once when placed; a recolor only repaints the object's bounds
+    (dirty rectangle), and compositing touches just the area covered by objects,
+    so the per-frame cost does not grow with the number of placed objects.
+    """
+    def __init__(self, sprites, detail=0):
+        self.sprites = sprites # SpriteCache keyed by obj.sprite_key(detail)
+        self.detail = detail
+        self.shape = None
+        self.color = None # premultiplied BGR
+        self.inv_alpha = None # 255 - alpha, 3 channels
+        self.rect = None # (x0, y0, x1, y1) union of painted objects, None when empty
+        self.count = 0 # objects painted, to notice changes made behind our back
+        self.valid = False
+
+    def invalidate(self):
+        """Forces a full rebuild on the next composite."""
+        self.valid = False
+
+    def set_detail(self, detail):
+        """Switches the sprite detail level; everything is repainted on the next composite."""
+        if detail != self.detail:
+            self.detail = detail
+            self.valid = False
+
+    def bounds(self, obj):
+        """(x0, y0, x1, y1) covered by the object's sprite, or None if it is not drawn."""
+        if obj.pos == (0, 0): return None
+        color, _, (ax, ay) = self.sprites.get(obj.sprite_key(self.detail))
+        h, w = color.shape[:2]
+        x0, y0 = obj.pos[0] - ax, obj.pos[1] - ay
+        return (x0, y0, x0 + w, y0 + h)
+
+    def add(self, obj):
+        """Paints a newly placed object on top of the others."""
+        if not self.valid: return # Painted with everything else on the next rebuild
+        self._paint(obj)
+        self.count += 1
+
+    def repaint(self, obj, objects):
+        """Repaints only the bounds of obj (e.g. after a recolor), keeping the stacking order."""
+        if not self.valid: return
+        rect = self._clip(self.bounds(obj))
+        if rect is None: return
+        x0, y0, x1, y1 = rect
+        self.color[y0:y1, x0:x1] = 0
+        self.inv_alpha[y0:y1, x0:x1] = 255
+        for other in objects:
+            b = self.bounds(other)
+            if b and b[0] < x1 and b[2] > x0 and b[1] < y1 and b[3] > y0:
+                self._paint(other, rect)
+
+    def rebuild(self, objects, shape):
+        h, w = shape[:2]
+        if self.shape != shape:
+            self.color = np.zeros((h, w, 3), np.uint8)
+            self.inv_alpha = np.full((h, w, 3), 255, np.uint8)
+            self.shape = shape
+        else:
+            self.color[:] = 0
+            self.inv_alpha[:] = 255
+        self.rect = None
+        for obj in objects:
+            self._paint(obj)
+        self.count = len(objects)
+        self.valid = True
+
+    def composite(self, img, objects):
+        """Blends all placed objects onto img in place."""
+        if not self.valid or img.shape != self.shape or len(objects) != self.count:
+            self.rebuild(objects, img.shape)
+        if self.rect is None:
+            return img
+        x0, y0, x1, y1 = self.rect
+        return blend_premultiplied(img, self.color[y0:y1, x0:x1], self.inv_alpha[y0:y1, x0:x1], x0, y0)
+
+    def _clip(self, rect):
+        if rect is None: return None
+        h, w = self.shape[:2]
+        x0, y0 = max(rect[0], 0), max(rect[1], 0)
+        x1, y1 = min(rect[2], w), min(rect[3], h)
+        return (x0, y0, x1, y1) if x0 < x1 and y0 < y1 else None
+
+    def _paint(self, obj, clip=None):
+        rect = self._clip(self.bounds(obj))
+        if rect is None: return
+        color, inv_alpha, (ax, ay) = self.sprites.get(obj.sprite_key(self.detail))
+        x, y = obj.pos[0] - ax, obj.pos[1] - ay
+
+        if clip is None:
+            x0, y0, x1, y1 = 0, 0, self.shape[1], self.shape[0]
+            r = self.rect
+            self.rect = rect if r is None else (min(r[0], rect[0]), min(r[1], rect[1]),
+                                               max(r[2], rect[2]), max(r[3], rect[3]))
+        else:
+            x0, y0, x1, y1 = clip
+        stack_premultiplied(self.color[y0:y1, x0:x1], self.inv_alpha[y0:y1, x0:x1],
+                            color, inv_alpha, x - x0, y - y0)
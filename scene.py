@@ -0,0 +1,155 @@
+from collections import Counter, defaultdict
+import numpy as np
+
+class UniformGrid:
+    """Uniform-grid spatial index: items are bucketed by the cells their rectangle covers."""
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        self.item_cells = {} # id(item) -> cells it was inserted in
+
+    def _cell_range(self, x0, y0, x1, y1):
+        s = self.cell_size
+        for cx in range(int(x0) // s, int(x1) // s + 1):
+            for cy in range(int(y0) // s, int(y1) // s + 1):
+                yield (cx, cy)
+
+    def insert(self, item, rect):
+        """rect is (x0, y0, x1, y1); a point is just a zero-size rect."""
+        cells = list(self._cell_range(*rect))
+        for cell in cells:
+            self.cells[cell].append(item)
+        self.item_cells[id(item)] = cells
+
+    def remove(self, item):
+        for cell in self.item_cells.pop(id(item), []):
+            self.cells[cell].remove(item)
+
+    def clear(self):
+        self.cells.clear()
+        self.item_cells.clear()
+
+    def at(self, x, y):
+        """Items whose cells contain the point (candidates, not exact hits)."""
+        s = self.cell_size
+        return self.cells.get((int(x) // s, int(y) // s), ())
+
+    def near(self, x, y, radius):
+        """Items in all cells touched by the square around the point (candidates)."""
+        for cell in self._cell_range(x - radius, y - radius, x + radius, y + radius):
+            yield from self.cells.get(cell, ())
+
+class SceneModel:
+    """
+    Placed objects and UI buttons behind one spatial index, with per-type counts kept up to date
+    incrementally. Mouse and pinch input share hit_test() and nearest().
+    """
+    def __init__(self, buttons=(), cell_size=128):
+        self.objects = [] # Placed objects, in stacking order
+        self.counts = Counter() # type -> number of placed objects
+        self.buttons = list(buttons)
+        self.hovered = None
+        self.object_index = UniformGrid(cell_size)
+        self.button_index = UniformGrid(cell_size)
+        for btn in self.buttons:
+            (x, y), (w, h) = btn.pos, btn.size
+            self.button_index.insert(btn, (x, y, x + w, y + h))
+
+    def add(self, obj):
+        self.objects.append(obj)
+        self.counts[obj.type] += 1
+        self.object_index.insert(obj, obj.pos + obj.pos)
+
+    def clear(self):
+        self.objects = []
+        self.counts.clear()
+        self.object_index.clear()
+
+    def has(self, obj_type):
+        return self.counts[obj_type] > 0
+
+    def hit_test(self, point):
+        """
+        Button under the point (or None). Keeps Button.hover in sync: only the button
+        under the last tested point is marked as hovered.
+        """
+        x, y = point
+        hit = None
+        for btn in self.button_index.at(x, y):
+            (bx, by), (bw, bh) = btn.pos, btn.size
+            if bx < x < bx + bw and by < y < by + bh:
+                hit = btn
+                break
+
+        if hit is not self.hovered:
+            if self.hovered is not None:
+                self.hovered.hover = False
+            if hit is not None:
+                hit.hover = True
+            self.hovered = hit
+        return hit
+
+    def nearest(self, obj_type, point, radius):
+        """Closest placed object of the given type within radius of point, or None."""
+        x, y = point
+        best, best_d2 = None, radius * radius
+        for obj in self.object_index.near(x, y, radius):
+            if obj.type != obj_type: continue
+            dx, dy = obj.pos[0] - x, obj.pos[1] - y
+            d2 = dx * dx + dy * dy
+            if d2 < best_d2:
+                best, best_d2 = obj, d2
+        return best
+
+class SceneStore:
+    """
+    Compact struct-of-arrays store for large numbers of placed objects (e.g. the kite wall):
+    positions, type codes, colors and a visibility flag live in NumPy arrays that grow by
+    doubling, so objects can be added, moved and drawn in bulk (see ui_components.draw_batched).
+    """
+    types = ('stick1', 'stick2', 'paper', 'color_blob') # type code -> type name
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.pos = np.zeros((capacity, 2), np.int32)
+        self.kind = np.zeros(capacity, np.int8)
+        self.color = np.zeros((capacity, 3), np.uint8)
+        self.visible = np.zeros(capacity, bool)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, n):
+        capacity = len(self.kind)
+        if n <= capacity: return
+        while capacity < n:
+            capacity *= 2
+        for name in ("pos", "kind", "color", "visible"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def add(self, obj_type, pos, color):
+        """Adds one object and returns its index."""
+        return int(self.extend([obj_type], [pos], [color])[0])
+
+    def extend(self, obj_types, positions, colors):
+        """Adds many objects at once. Returns their indices."""
+        n = len(obj_types)
+        self._reserve(self.size + n)
+        idx = np.arange(self.size, self.size + n)
+        self.kind[idx] = [self.types.index(t) for t in obj_types]
+        self.pos[idx] = positions
+        self.color[idx] = colors
+        self.visible[idx] = True
+        self.size += n
+        return idx
+
+    def clear(self):
+        self.size = 0
+
+    def indices(self, obj_type):
+        """Indices of the visible objects of a type."""
+        n = self.size
+        return np.flatnonzero((self.kind[:n] == self.types.index(obj_type)) & self.visible[:n])
@@ -1,9 +1,13 @@
 import cv2
 import numpy as np
 import math
-from utils import draw_transparent_rect, draw_neon_line
+from functools import lru_cache
+from utils import draw_glow_line, draw_glow_polyline, blend_region, render_premultiplied
+from render_cache import SpriteCache, TextCache
 
 class Button:
+    text_cache = TextCache() # Labels are rasterized once, shared by all buttons
+
     def __init__(self, text, pos, size=(180, 60), color=(40, 40, 40), text_color=(255, 255, 255), action_id=None):
         self.text = text
         self.pos = pos
@@ -28,8 +32,8 @@ class Button:
         cv2.rectangle(img, (x, y), (x + w, y + h), border_color, 2)
         
         # Text
-        cv2.putText(img, self.text, (x + 20, y + 40), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.text_color, 2)
+        self.text_cache.put(img, self.text, (x + 20, y + 40),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, self.text_color, 2)
 
     def is_hover(self, x, y):
         bx, by = self.pos
@@ -37,7 +41,21 @@ class Button:
         self.hover = (bx < x < bx + bw and by < y < by + bh)
         return self.hover
 
+# Sprite canvas (w, h) and the object center inside it; large enough for the paper with its tail and manjha
+SPRITE_CANVAS = (360, 500)
+SPRITE_ANCHOR = (180, 170)
+
+# Sprite detail levels, picked by the quality tier (see quality.py): neon glow pass,
+# points along the paper's wavy tail, and the paper stripes.
+DETAIL_LEVELS = [
+    {"glow": True, "tail_points": 15, "stripes": True},
+    {"glow": False, "tail_points": 8, "stripes": True},
+    {"glow": False, "tail_points": 5, "stripes": False},
+]
+
 class DraggableObject:
+    __slots__ = ("id", "type", "pos", "placed", "dragging", "color")
+
     def __init__(self, obj_id, obj_type):
         self.id = obj_id
         self.type = obj_type # 'stick1', 'stick2', 'paper'
@@ -54,20 +72,43 @@ class DraggableObject:
         self.dragging = False
         self.placed = True
 
-    def draw(self, img):
+    def sprite_key(self, detail=0):
+        return (self.type, self.color, detail)
+
+    def draw(self, img, detail=0):
         if self.pos == (0, 0): return
+        # Each (type, color, detail) is rendered once and then only blended around the object,
+        # so a recolor just renders the sprite for the new color.
+        DraggableObject.sprites.blit(img, self.sprite_key(detail), self.pos)
 
-        cx, cy = self.pos
+    @staticmethod
+    def render_sprite(key):
+        """Renders the sprite for a (type, color, detail) key, cropped to what was drawn."""
+        obj_type, color, detail = key
+        w, h = SPRITE_CANVAS
+        ax, ay = SPRITE_ANCHOR
+        sprite = render_premultiplied(
+            lambda img: DraggableObject.render_shape(img, obj_type, color, (ax, ay), detail), (h, w, 3))
+
+        x, y, w, h = cv2.boundingRect(sprite[:, :, 3])
+        if w == 0 or h == 0:
+            return sprite[:1, :1], (0, 0)
+        return sprite[y:y+h, x:x+w], (ax - x, ay - y)
+
+    @staticmethod
+    def render_shape(img, obj_type, color, center, detail=0):
+        """Draws an object of the given type and color centered at center, at a DETAIL_LEVELS level."""
+        cx, cy = center
+        level = DETAIL_LEVELS[detail]
         
-        if self.type == 'stick1':
+        if obj_type == 'stick1':
             # Vertical Stick (Manjha/Spine)
-            cv2.line(img, (cx, cy - 90), (cx, cy + 90), self.color, 4)
+            cv2.line(img, (cx, cy - 90), (cx, cy + 90), color, 4)
             # Add neon glow
-            overlay = img.copy()
-            cv2.line(overlay, (cx, cy - 90), (cx, cy + 90), self.color, 8)
-            cv2.addWeighted(overlay, 0.4, img, 0.6, 0, img)
+            if level["glow"]:
+                draw_glow_line(img, (cx, cy - 90), (cx, cy + 90), color, 8)
             
-        elif self.type == 'stick2':
+        elif obj_type == 'stick2':
             # Curved/Horizontal Stick (Kamani/Bow)
             # We simulate a curve using polylines for better visual
             pts = []
@@ -83,11 +124,10 @@ class DraggableObject:
             pts = np.array(pts, np.int32)
             cv2.polylines(img, [pts], False, (255, 0, 255), 4)
             # Glow
-            overlay = img.copy()
-            cv2.polylines(overlay, [pts], False, (255, 0, 255), 8)
-            cv2.addWeighted(overlay, 0.4, img, 0.6, 0, img)
+            if level["glow"]:
+                draw_glow_polyline(img, pts, (255, 0, 255), 8)
 
-        elif self.type == 'paper':
+        elif obj_type == 'paper':
             # Diamond shape paper
             size = 90
             pts = np.array([
@@ -98,29 +138,30 @@ class DraggableObject:
             ], np.int32)
             
             # Draw Tail (Wavy Ribbon)
-            tail_color = (self.color[0]//2, self.color[1]//2, self.color[2]//2)
+            tail_color = (color[0]//2, color[1]//2, color[2]//2)
             pts_tail = []
-            for i in range(15):
+            # Fewer points on lower detail levels, spread over the same length
+            for i in np.linspace(0, 14, level["tail_points"]):
                 tx = cx + int(15 * math.sin(i * 0.5)) 
-                ty = cy + size + (i * 12)
+                ty = cy + size + int(i * 12)
                 pts_tail.append((tx, ty))
             
             pts_tail = np.array(pts_tail, np.int32)
             cv2.polylines(img, [pts_tail], False, tail_color, 6)
             
-            overlay = img.copy()
-            cv2.fillPoly(overlay, [pts], self.color)
-            
-            # Paper Texture / Pattern (Stripes)
-            # Create a localized pattern mask if possible, or just draw lines
-            for i in range(-size, size, 20):
-                 pt1 = (cx + i, cy - size + abs(i))
-                 pt2 = (cx + i, cy + size - abs(i))
-                 # Only draw if inside diamond... simplified by clipping or just careful math
-                 # Let's just draw faint lines
-                 cv2.line(overlay, (cx - size//2, cy - size//2 + i + 50), (cx + size//2, cy + size//2 + i + 50), (255, 255, 255), 1)
-
-            cv2.addWeighted(overlay, 0.7, img, 0.3, 0, img) # Richer paper
+            def draw_paper(overlay, offset):
+                dx, dy = offset
+                cv2.fillPoly(overlay, [pts + (dx, dy)], color)
+                
+                # Paper Texture / Pattern (Stripes)
+                # Create a localized pattern mask if possible, or just draw lines
+                if not level["stripes"]: return
+                for i in range(-size, size, 20):
+                     # Let's just draw faint lines
+                     cv2.line(overlay, (cx - size//2 + dx, cy - size//2 + i + 50 + dy), (cx + size//2 + dx, cy + size//2 + i + 50 + dy), (255, 255, 255), 1)
+
+            # Stripes run below the diamond, so the blended region extends to cover them
+            blend_region(img, (cx - size, cy - size, cx + size + 1, cy + 2 * size), draw_paper, 0.7) # Richer paper
             
             # Draw internal structure hints (sticks)
             # Vertical Spine
@@ -139,7 +180,7 @@ class DraggableObject:
             cv2.line(img, mid_pt, end_pt, (240, 240, 240), 1)
             
             # Side Tassels (Funde) - Classic Indian Kite Feature
-            tassel_color = self.color
+            tassel_color = color
             # Left Tassel
             lt_pts = np.array([
                 (cx - size, cy),
@@ -160,10 +201,104 @@ class DraggableObject:
             cv2.circle(img, (cx, cy), 5, (20, 20, 20), -1)
             cv2.circle(img, (cx, cy), 6, (200, 200, 200), 1)
 
-        elif self.type == 'color_blob':
+        elif obj_type == 'color_blob':
             # Paint bucket splash look
-            cv2.circle(img, (cx, cy), 20, self.color, -1)
+            cv2.circle(img, (cx, cy), 20, color, -1)
             cv2.circle(img, (cx, cy), 15, (255, 255, 255), 2)
             # Drips
-            cv2.circle(img, (cx - 10, cy + 15), 5, self.color, -1)
-            cv2.circle(img, (cx + 8, cy + 20), 4, self.color, -1)
+            cv2.circle(img, (cx - 10, cy + 15), 5, color, -1)
+            cv2.circle(img, (cx + 8, cy + 20), 4, color, -1)
+
+DraggableObject.sprites = SpriteCache(DraggableObject.render_sprite)
+
+def _circle(cx, cy, r, n=16):
+    a = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    return np.stack([cx + r * np.cos(a), cy + r * np.sin(a)], axis=1)
+
+@lru_cache(maxsize=None)
+def shape_parts(obj_type, detail=0, strings=True):
+    """
+    render_shape's geometry as polygon templates around (0, 0), for drawing many objects in
+    batches. Each part is (kind, polys, color, thickness): kind is "fill", "open" or "closed",
+    polys an (m, P, 2) array, color a BGR tuple or "own" / "half" (the object's color, or half
+    of it). Glow and paper stripes are left out, the paper is filled opaque. strings=False
+    leaves out the paper's tail and manjha (flight mode simulates them).
+    """
+    level = DETAIL_LEVELS[detail]
+    parts = []
+    if obj_type == 'stick1':
+        parts.append(("open", [[(0, -90), (0, 90)]], "own", 4))
+
+    elif obj_type == 'stick2':
+        curve = [(i, int(-(1 - (i / 100) ** 2) * 30)) for i in range(-100, 101, 10)]
+        parts.append(("open", [curve], (255, 0, 255), 4))
+
+    elif obj_type == 'paper':
+        size = 90
+        diamond = [(0, -size), (size, 0), (0, size), (-size, 0)]
+        tail = [(int(15 * math.sin(i * 0.5)), size + int(i * 12)) for i in np.linspace(0, 14, level["tail_points"])]
+        if strings:
+            parts.append(("open", [tail], "half", 6))
+        parts += [
+            ("fill", [diamond], "own", 0),
+            ("open", [[(0, -size), (0, size)]], (40, 40, 40), 3), # Spine
+            ("open", [[(-size, 0), (size, 0)]], (40, 40, 40), 2), # Bow
+            ("closed", [diamond], (255, 255, 255), 3),
+        ]
+        if strings:
+            parts.append(("open", [[(0, size + 5), (-20, 150), (-50, 300)]], (240, 240, 240), 1)) # Manjha
+        parts += [
+            ("fill", [[(-size, 0), (-size - 15, -10), (-size - 15, 10)],
+                      [(size, 0), (size + 15, -10), (size + 15, 10)]], "own", 0), # Tassels
+            ("fill", [_circle(0, 0, 5, 8)], (20, 20, 20), 0), # Knot
+        ]
+
+    elif obj_type == 'color_blob':
+        parts += [
+            ("fill", [_circle(0, 0, 20), _circle(-10, 15, 5), _circle(8, 20, 4)], "own", 0),
+            ("closed", [_circle(0, 0, 15)], (255, 255, 255), 2),
+        ]
+    return [(kind, np.array(polys, np.float32), color, thickness) for kind, polys, color, thickness in parts]
+
+def shape_bounds(obj_type, detail=0, strings=True):
+    """(x0, y0, x1, y1) around (0, 0) covered by shape_parts at scale 1."""
+    x0 = y0 = x1 = y1 = 0
+    for _, polys, _, thickness in shape_parts(obj_type, detail, strings):
+        pad = thickness / 2
+        (px0, py0), (px1, py1) = polys.reshape(-1, 2).min(axis=0) - pad, polys.reshape(-1, 2).max(axis=0) + pad
+        x0, y0, x1, y1 = min(x0, px0), min(y0, py0), max(x1, px1), max(y1, py1)
+    return (x0, y0, x1, y1)
+
+# Types in batch drawing order: the paper is filled opaque, so the sticks go on top of it
+BATCH_ORDER = ('paper', 'stick1', 'stick2', 'color_blob')
+
+def draw_batched(img, store, scale=1.0, detail=0, strings=True):
+    """
+    Draws every visible object of a SceneStore, batched by type: each shape part is one
+    cv2.fillPoly / cv2.polylines call over all objects of a type (per color for colored parts),
+    with the part's template scaled once and translated by the object positions.
+    """
+    for obj_type in BATCH_ORDER:
+        idx = store.indices(obj_type)
+        if not len(idx): continue
+        pos = store.pos[idx][:, None, None] # (k, 1, 1, 2) against (m, P, 2) templates
+        colors, which = np.unique(store.color[idx], axis=0, return_inverse=True)
+        which = which.ravel()
+        by_color = [(tuple(int(v) for v in c), which == i) for i, c in enumerate(colors)]
+
+        for kind, polys, color, thickness in shape_parts(obj_type, detail, strings):
+            template = np.rint(polys * scale).astype(np.int32)
+            if color == "own":
+                groups = by_color
+            elif color == "half":
+                groups = [(tuple(v // 2 for v in c), sel) for c, sel in by_color]
+            else:
+                groups = [(color, slice(None))]
+
+            for c, sel in groups:
+                pts = list((template + pos[sel]).reshape(-1, template.shape[1], 2))
+                if kind == "fill":
+                    cv2.fillPoly(img, pts, c)
+                else:
+                    cv2.polylines(img, pts, kind == "closed", c, max(1, round(thickness * scale)))
+    return img
@@ -1,44 +1,188 @@
+import threading
 import cv2
 import numpy as np
 
-def overlay_transparent(background, overlay, x, y):
+class ScratchBuffer:
     """
-    Overlays a transparent PNG onto the background at position (x, y).
+    Reusable flat buffer that hands out C-contiguous views of any shape, growing only when
+    a bigger view is asked for. A view is only valid until the next view() call.
     """
-    bg_h, bg_w, _ = background.shape
-    h, w, c = overlay.shape
+    def __init__(self, dtype=np.uint8):
+        self.buf = np.empty(0, dtype)
+
+    def view(self, shape):
+        size = int(np.prod(shape))
+        if self.buf.size < size:
+            self.buf = np.empty(size, self.buf.dtype)
+        return self.buf[:size].reshape(shape)
+
+_thread_scratch = threading.local() # Per-thread ScratchBuffer for blend_region (web sessions render concurrently)
 
-    if x >= bg_w or y >= bg_h:
+def _sprite_slices(bg_shape, sprite_shape, x, y):
+    """Clips a sprite placed at (x, y) to the background; returns (background, sprite) slices or None."""
+    bg_h, bg_w = bg_shape[:2]
+    h, w = sprite_shape[:2]
+
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, bg_w), min(y + h, bg_h)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (slice(y0, y1), slice(x0, x1)), (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+
+def blend_premultiplied(background, color, inv_alpha, x, y):
+    """
+    Blends a premultiplied sprite onto the background at position (x, y), in place.
+    color is the premultiplied BGR image and inv_alpha the 3-channel (255 - alpha),
+    see split_premultiplied. Only the region covered by the sprite is touched and
+    the sprite is clipped on all edges.
+    """
+    slices = _sprite_slices(background.shape, color.shape, x, y)
+    if slices is None:
         return background
+    bg, src = slices
+    roi = background[bg]
 
-    if x + w > bg_w:
-        w = bg_w - x
-        overlay = overlay[:, :w]
+    # roi = color + roi * (255 - alpha) / 255
+    cv2.multiply(roi, inv_alpha[src], dst=roi, scale=1 / 255)
+    cv2.add(roi, color[src], dst=roi)
+    return background
 
-    if y + h > bg_h:
-        h = bg_h - y
-        overlay = overlay[:h]
+def premultiply(sprite):
+    """
+    Converts a straight-alpha BGRA image (e.g. a PNG loaded with cv2.IMREAD_UNCHANGED)
+    into the (color, inv_alpha) pair used by blend_premultiplied.
+    """
+    alpha = cv2.cvtColor(cv2.extractChannel(sprite, 3), cv2.COLOR_GRAY2BGR)
+    color = cv2.multiply(cv2.cvtColor(sprite, cv2.COLOR_BGRA2BGR), alpha, scale=1 / 255)
+    return color, cv2.bitwise_not(alpha)
 
-    if c < 4:
+def overlay_transparent(background, overlay, x, y):
+    """
+    Overlays a transparent PNG onto the background at position (x, y), in place.
+    The overlay is clipped on all edges, so x and y may be negative or run off the frame.
+    An overlay without an alpha channel is copied as is (fully opaque).
+    For sprites drawn every frame, premultiply() once and use blend_premultiplied instead.
+    """
+    slices = _sprite_slices(background.shape, overlay.shape, x, y)
+    if slices is None:
         return background
+    bg, src = slices
 
-    alpha = overlay[:, :, 3] / 255.0
-    
-    # 3 channels for BGR
-    for c in range(0, 3):
-        background[y:y+h, x:x+w, c] = (alpha * overlay[:, :, c] +
-                                      (1.0 - alpha) * background[y:y+h, x:x+w, c])
+    channels = overlay.shape[2] if overlay.ndim == 3 else 1
+    if channels < 4:
+        visible = overlay[src]
+        background[bg] = visible if channels == 3 else cv2.cvtColor(visible, cv2.COLOR_GRAY2BGR)
+        return background
 
+    # Only the visible part is premultiplied
+    color, inv_alpha = premultiply(overlay[src])
+    blend_premultiplied(background[bg], color, inv_alpha, 0, 0)
     return background
 
+def stack_premultiplied(layer_color, layer_inv_alpha, color, inv_alpha, x, y):
+    """
+    Composites a premultiplied sprite over a premultiplied layer (both as (color, inv_alpha)
+    pairs), in place, so the layer can later be blended onto a frame in one pass.
+    """
+    slices = _sprite_slices(layer_color.shape, color.shape, x, y)
+    if slices is None:
+        return
+    bg, src = slices
+    blend_premultiplied(layer_color[bg], color[src], inv_alpha[src], 0, 0)
+    roi = layer_inv_alpha[bg]
+    cv2.multiply(roi, inv_alpha[src], dst=roi, scale=1 / 255)
+
+def split_premultiplied(sprite):
+    """
+    Splits a premultiplied BGRA image into the (color, inv_alpha) pair used by blend_premultiplied.
+    """
+    color = np.ascontiguousarray(sprite[:, :, :3])
+    inv_alpha = cv2.cvtColor(255 - sprite[:, :, 3], cv2.COLOR_GRAY2BGR)
+    return color, inv_alpha
+
+def render_premultiplied(draw, shape):
+    """
+    Renders draw(img) once over black and once over white and recovers a premultiplied
+    BGRA image from the difference, so any mix of opaque drawing and addWeighted
+    blending can be cached and blended later with blend_premultiplied.
+    """
+    black = np.zeros(shape, np.uint8)
+    white = np.full(shape, 255, np.uint8)
+    draw(black)
+    draw(white)
+
+    # Whatever survives of the white background is the transmittance (255 - alpha).
+    # Blends weight all channels the same, so one channel is enough.
+    transmittance = cv2.subtract(cv2.extractChannel(white, 1), cv2.extractChannel(black, 1))
+    alpha = cv2.bitwise_not(transmittance)
+
+    color = cv2.min(black, cv2.cvtColor(alpha, cv2.COLOR_GRAY2BGR))
+    return cv2.merge((color, alpha))
+
+def blend_region(img, rect, draw, alpha=0.5):
+    """
+    Runs draw(overlay, offset) on a copy of just rect = (x0, y0, x1, y1) and blends it back
+    with the given alpha. offset is the (dx, dy) to add to image coordinates.
+    Nothing outside the (clipped) rect is copied or touched.
+    """
+    h, w = img.shape[:2]
+    x0, y0, x1, y1 = rect
+    x0, y0 = max(int(x0), 0), max(int(y0), 0)
+    x1, y1 = min(int(x1), w), min(int(y1), h)
+    if x0 >= x1 or y0 >= y1:
+        return img
+
+    roi = img[y0:y1, x0:x1]
+    scratch = getattr(_thread_scratch, "buffer", None)
+    if scratch is None:
+        scratch = _thread_scratch.buffer = ScratchBuffer()
+    overlay = scratch.view(roi.shape)
+    np.copyto(overlay, roi)
+    draw(overlay, (-x0, -y0))
+    cv2.addWeighted(overlay, alpha, roi, 1 - alpha, 0, roi)
+    return img
+
+def _points_rect(pts, pad):
+    pts = np.asarray(pts).reshape(-1, 2)
+    (x0, y0), (x1, y1) = pts.min(axis=0), pts.max(axis=0)
+    return (x0 - pad, y0 - pad, x1 + pad + 1, y1 + pad + 1)
+
+def _offset_points(pts, offset):
+    return (np.asarray(pts, np.int32).reshape(-1, 2) + np.array(offset, np.int32)).reshape(-1, 1, 2)
+
 def draw_transparent_rect(img, pt1, pt2, color, alpha=0.5):
     """
     Draws a transparent rectangle on the image.
     """
-    overlay = img.copy()
-    cv2.rectangle(overlay, pt1, pt2, color, -1)
-    cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
-    return img
+    def draw(overlay, offset):
+        dx, dy = offset
+        cv2.rectangle(overlay, (pt1[0] + dx, pt1[1] + dy), (pt2[0] + dx, pt2[1] + dy), color, -1)
+    return blend_region(img, _points_rect([pt1, pt2], 0), draw, alpha)
+
+def draw_glow_line(img, pt1, pt2, color, thickness, alpha=0.4):
+    """
+    Draws a translucent (glow) line on the image.
+    """
+    def draw(overlay, offset):
+        dx, dy = offset
+        cv2.line(overlay, (pt1[0] + dx, pt1[1] + dy), (pt2[0] + dx, pt2[1] + dy), color, thickness)
+    return blend_region(img, _points_rect([pt1, pt2], thickness // 2 + 1), draw, alpha)
+
+def draw_glow_polyline(img, pts, color, thickness, alpha=0.4, closed=False):
+    """
+    Draws a translucent (glow) polyline on the image.
+    """
+    def draw(overlay, offset):
+        cv2.polylines(overlay, [_offset_points(pts, offset)], closed, color, thickness)
+    return blend_region(img, _points_rect(pts, thickness // 2 + 1), draw, alpha)
+
+def draw_transparent_poly(img, pts, color, alpha=0.5):
+    """
+    Draws a transparent filled polygon on the image.
+    """
+    def draw(overlay, offset):
+        cv2.fillPoly(overlay, [_offset_points(pts, offset)], color)
+    return blend_region(img, _points_rect(pts, 0), draw, alpha)
 
 def create_kite_mask(shape, center, size, color):
     """
@@ -62,9 +206,7 @@ def draw_neon_line(img, pt1, pt2, color, thickness=2, glow_radius=10):
     Draws a line with a neon glow effect.
     """
     # Draw glow
-    overlay = img.copy()
-    cv2.line(overlay, pt1, pt2, color, thickness + glow_radius)
-    cv2.addWeighted(overlay, 0.4, img, 0.6, 0, img)
+    draw_glow_line(img, pt1, pt2, color, thickness + glow_radius)
     # Draw core
     cv2.line(img, pt1, pt2, (255, 255, 255), thickness)
     return img
@@ -1,31 +1,35 @@
 import cv2
 import streamlit as st
-from streamlit_webrtc import webrtc_streamer, VideoTransformerBase
-import threading
+from streamlit_webrtc import webrtc_streamer
 
 # Import our Kite App logic
 from kite_app import KiteApp
+from inference_service import InferenceService, SharedHandDetector
+from webrtc_processor import KiteVideoProcessor
 
 st.set_page_config(page_title="AR Kite Maker", layout="wide")
 
 st.title("🪁 AR Kite Maker")
 st.markdown("Use hand gestures to build your kite! Drag and drop components.")
 
-class KiteTransformer(VideoTransformerBase):
-    def __init__(self):
-        self.app = KiteApp(use_camera=False)
-        self.app.screenshot_pending = False # Manage state here if needed
-        
-    def transform(self, frame):
-        img = frame.to_ndarray(format="bgr24")
-        
-        # Process frame using our existing logic
-        img = self.app.process_frame(img)
-        
-        return img
+@st.cache_resource
+def get_inference_service():
+    # One detector pool for the whole server; sessions only keep their app state
+    return InferenceService(workers=2, max_hands=1).start()
+
+def make_processor(service):
+    detector = SharedHandDetector(service, max_hands=1, inference_scale=0.5, roi_tracking=True)
+    # Frames are processed on a per-session worker, newest frame only (see KiteVideoProcessor)
+    return KiteVideoProcessor(KiteApp(use_camera=False, detector=detector))
 
 # WebRTC Streamer
-webrtc_streamer(key="kite-ar", video_transformer_factory=KiteTransformer)
+service = get_inference_service()
+ctx = webrtc_streamer(key="kite-ar", video_processor_factory=lambda: make_processor(service), async_processing=True)
+
+if ctx.video_processor:
+    with st.expander("Session stats"):
+        st.button("Refresh")
+        st.json(ctx.video_processor.stats())
 
 st.markdown("### Instructions")
 st.markdown("- **Select Tool**: Click sidebar buttons (on video if implemented, or we might need to map HTML buttons to Python state).")
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+import av
+from streamlit_webrtc import VideoProcessorBase
+
+logger = logging.getLogger(__name__)
+_session_ids = count()
+
+class KiteVideoProcessor(VideoProcessorBase):
+    """
+    Async WebRTC processor for one session that never lets frames back up.
+
+    recv_queued() gets every frame that arrived since the previous call and keeps only the
+    newest (the others are counted as dropped). If the session's executor is idle, the newest
+    frame goes to app.process_frame there and is awaited for up to max_wait seconds. While a
+    frame is still in flight, the call returns the last rendered frame right away and drops
+    the new one, so the next frame to be processed is always the freshest one. Latency stays
+    around one processing time however slow processing gets; the frame rate drops instead.
+
+    One worker thread per session keeps the app's frames in order and off the event loop.
+    """
+    def __init__(self, app, max_wait=1 / 30):
+        self.app = app
+        self.max_wait = max_wait
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix=f"kite-session-{next(_session_ids)}")
+        self.in_flight = None # asyncio future of the frame being processed
+        self.last_image = None # last rendered BGR image, sent again while a frame is in flight
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0 # frames never processed: coalesced or arrived while busy
+        self.repeated = 0 # times the last rendered frame was sent again
+        self.errors = 0
+        self.queue_depth = 0 # frames handed to the last recv_queued call
+        self.max_queue_depth = 0
+        self.process_time = 0.0 # seconds, smoothed
+
+    def recv(self, frame):
+        """Synchronous path (async_processing=False): processes inline."""
+        self.received += 1
+        img = self._process(frame.to_ndarray(format="bgr24"))
+        self.processed += 1
+        return self._frame(img, frame)
+
+    async def recv_queued(self, frames):
+        newest = frames[-1]
+        self.received += len(frames)
+        self.dropped += len(frames) - 1
+        self.queue_depth = len(frames)
+        self.max_queue_depth = max(self.max_queue_depth, len(frames))
+
+        if self.in_flight is not None and not self.in_flight.done():
+            self.dropped += 1
+            return [self._repeat(newest)]
+        self._collect()
+
+        img = newest.to_ndarray(format="bgr24")
+        self.in_flight = asyncio.get_running_loop().run_in_executor(self.executor, self._process, img)
+        await asyncio.wait({self.in_flight}, timeout=self.max_wait)
+        if self._collect():
+            return [self._frame(self.last_image, newest)]
+        return [self._repeat(newest)]
+
+    def _process(self, img):
+        start = time.perf_counter()
+        img = self.app.process_frame(img)
+        self.process_time += 0.1 * ((time.perf_counter() - start) - self.process_time)
+        return img
+
+    def _collect(self):
+        """Takes over the result of a finished frame. Returns whether there was one."""
+        future, self.in_flight = self.in_flight, None
+        if future is None or not future.done():
+            self.in_flight = future
+            return False
+        if future.cancelled():
+            return False
+        if future.exception() is not None:
+            self.errors += 1
+            logger.error("process_frame failed", exc_info=future.exception())
+            return False
+        self.last_image = future.result()
+        self.processed += 1
+        return True
+
+    def _repeat(self, frame):
+        if self.last_image is None:
+            return frame # Nothing rendered yet: pass the camera frame through
+        self.repeated += 1
+        return self._frame(self.last_image, frame)
+
+    @staticmethod
+    def _frame(img, frame):
+        """
+        A new av.VideoFrame of img with frame's timestamp. Returned frames can still be queued
+        for encoding, so one is never reused: setting its pts again would retime the queued one.
+        """
+        out = av.VideoFrame.from_ndarray(img, format="bgr24")
+        out.pts = frame.pts
+        out.time_base = frame.time_base
+        return out
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "repeated": self.repeated,
+            "errors": self.errors,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self.in_flight is not None and not self.in_flight.done(),
+            "process_ms": self.process_time * 1000,
+        }
+
+    def on_ended(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.app.close()
+        self.app.detector.close()